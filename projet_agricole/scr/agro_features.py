@@ -0,0 +1,163 @@
+import numpy as np
+import pandas as pd
+
+from weather_stream import DAILY_AGGREGATIONS
+
+# Degrés-jours de croissance (méthode modifiée) : températures ramenées
+# entre la base et le plafond avant le calcul (°C)
+BASE_TEMPERATURE = 10.0
+CAP_TEMPERATURE = 30.0
+# Fenêtres (jours) des cumuls glissants de précipitation
+RAIN_WINDOWS = (7, 30)
+
+# Agrégations journalières nécessaires aux grandeurs dérivées
+DERIVED_AGGREGATIONS = dict(DAILY_AGGREGATIONS,
+                            humidite=('humidite', 'mean'),
+                            vitesse_vent=('vitesse_vent', 'mean'))
+
+# Constantes FAO-56
+SOLAR_CONSTANT = 0.0820      # MJ m-2 min-1
+STEFAN_BOLTZMANN = 4.903e-9  # MJ K-4 m-2 jour-1
+# Cumul journalier de mesures horaires en W/m² vers MJ/m²
+HOURLY_WM2_TO_MJ = 0.0036
+
+
+def growing_degree_days(tmin, tmax, base=BASE_TEMPERATURE, cap=CAP_TEMPERATURE):
+    """Degrés-jours de croissance journaliers"""
+    tmin = np.clip(tmin, base, cap)
+    tmax = np.clip(tmax, base, cap)
+    return (tmin + tmax) / 2 - base
+
+
+def saturation_vapour_pressure(temperature):
+    """Pression de vapeur saturante (kPa) à une température (°C)"""
+    return 0.6108 * np.exp(17.27 * temperature / (temperature + 237.3))
+
+
+def extraterrestrial_radiation(latitude, day_of_year):
+    """Rayonnement extraterrestre journalier Ra (MJ/m²/jour), FAO-56 éq. 21"""
+    phi = np.radians(latitude)
+    inverse_distance = 1 + 0.033 * np.cos(2 * np.pi / 365 * day_of_year)
+    declination = 0.409 * np.sin(2 * np.pi / 365 * day_of_year - 1.39)
+    sunset_angle = np.arccos(np.clip(-np.tan(phi) * np.tan(declination), -1, 1))
+    return 24 * 60 / np.pi * SOLAR_CONSTANT * inverse_distance * (
+        sunset_angle * np.sin(phi) * np.sin(declination)
+        + np.cos(phi) * np.cos(declination) * np.sin(sunset_angle))
+
+
+def reference_evapotranspiration(tmin, tmax, humidity, wind_speed, radiation,
+                                 latitude, day_of_year, altitude=0.0, wind_height=2.0):
+    """
+    Évapotranspiration de référence journalière ET0 (mm/jour) selon
+    Penman-Monteith FAO-56.
+
+    humidity : humidité relative moyenne (%)
+    wind_speed : vitesse moyenne du vent (m/s) mesurée à wind_height mètres
+    radiation : rayonnement solaire global Rs (MJ/m²/jour)
+    """
+    tmean = (tmin + tmax) / 2
+    pressure = 101.3 * ((293 - 0.0065 * altitude) / 293) ** 5.26
+    gamma = 0.000665 * pressure
+    wind_2m = wind_speed * 4.87 / np.log(67.8 * wind_height - 5.42)
+
+    es = (saturation_vapour_pressure(tmin) + saturation_vapour_pressure(tmax)) / 2
+    ea = np.clip(humidity, 0, 100) / 100 * es
+    delta = 4098 * saturation_vapour_pressure(tmean) / (tmean + 237.3) ** 2
+
+    # Rayonnement net : courtes longueurs d'onde moins rayonnement infrarouge
+    ra = extraterrestrial_radiation(latitude, day_of_year)
+    clear_sky = (0.75 + 2e-5 * altitude) * ra
+    with np.errstate(invalid='ignore', divide='ignore'):
+        relative = np.where(clear_sky > 0, np.minimum(radiation / clear_sky, 1.0), 0.5)
+    net_longwave = STEFAN_BOLTZMANN * ((tmax + 273.16) ** 4 + (tmin + 273.16) ** 4) / 2 \
+        * (0.34 - 0.14 * np.sqrt(ea)) * (1.35 * relative - 0.35)
+    net_radiation = 0.77 * radiation - net_longwave
+
+    et0 = (0.408 * delta * net_radiation
+           + gamma * 900 / (tmean + 273) * wind_2m * (es - ea)) \
+        / (delta + gamma * (1 + 0.34 * wind_2m))
+    return np.maximum(et0, 0.0)
+
+
+def daily_weather(weather, station_column='station_id'):
+    """
+    Série journalière (par station le cas échéant) sur un calendrier
+    complet ; une série déjà journalière (temperature_min/max) est reprise
+    telle quelle
+    """
+    stations = station_column in weather.columns
+    if {'temperature_min', 'temperature_max'}.issubset(weather.columns):
+        daily = weather.copy()
+        daily.index = daily.index.floor('D')
+    else:
+        aggregations = {name: spec for name, spec in DERIVED_AGGREGATIONS.items()
+                        if spec[0] in weather.columns}
+        keys = [weather.index.floor('D').rename('date')]
+        if stations:
+            keys.insert(0, weather[station_column].astype(object).rename(station_column))
+        daily = weather.groupby(keys, observed=True).agg(**aggregations)
+        if stations:
+            daily = daily.reset_index(station_column)
+
+    # Jours sans observation : lignes vides, pour que les fenêtres soient
+    # exprimées en jours calendaires
+    if stations:
+        return daily.groupby(station_column, group_keys=False)[daily.columns].apply(
+            lambda group: group.drop(columns=station_column).asfreq('D')
+            .assign(**{station_column: group[station_column].iloc[0]}))
+    return daily.asfreq('D')
+
+
+def derive_weather_features(weather, latitude, station_column='station_id',
+                            base=BASE_TEMPERATURE, cap=CAP_TEMPERATURE,
+                            rain_windows=RAIN_WINDOWS, altitude=0.0, wind_height=2.0):
+    """
+    Calcule en une passe les grandeurs agronomiques journalières de toute
+    la série météo (par station si la colonne station_column existe) :
+
+    gdd, gdd_cumul : degrés-jours de croissance et leur cumul par année civile
+    precipitation_<n>j : cumul glissant des précipitations sur n jours
+    et0 : évapotranspiration de référence Penman-Monteith (mm/jour)
+
+    latitude : latitude (degrés) de la station, ou série indexée par station
+    Seules les grandeurs dont les colonnes sources sont présentes sont
+    calculées. Retourne un tableau indexé par jour.
+    """
+    daily = daily_weather(weather, station_column)
+    stations = station_column in daily.columns
+    group_keys = [daily[station_column]] if stations else []
+    derived = pd.DataFrame(index=daily.index)
+    if stations:
+        derived[station_column] = daily[station_column]
+
+    if {'temperature_min', 'temperature_max'}.issubset(daily.columns):
+        gdd = growing_degree_days(daily['temperature_min'], daily['temperature_max'], base, cap)
+        derived['gdd'] = gdd
+        derived['gdd_cumul'] = gdd.fillna(0).groupby(group_keys + [daily.index.year]).cumsum()
+
+    if 'precipitation' in daily.columns:
+        # Les lignes de chaque station sont contiguës et triées par date :
+        # les résultats par groupe gardent l'ordre des lignes
+        rain = daily['precipitation']
+        for window in rain_windows:
+            if stations:
+                total = rain.groupby(daily[station_column].to_numpy(), sort=False) \
+                    .rolling(window, min_periods=1).sum()
+            else:
+                total = rain.rolling(window, min_periods=1).sum()
+            derived[f'precipitation_{window}j'] = total.to_numpy()
+
+    required = {'temperature_min', 'temperature_max', 'humidite', 'vitesse_vent', 'rayonnement_solaire'}
+    if required.issubset(daily.columns):
+        station_latitude = daily[station_column].map(latitude).to_numpy(dtype=float) \
+            if stations and isinstance(latitude, pd.Series) else float(latitude)
+        derived['et0'] = reference_evapotranspiration(
+            daily['temperature_min'].to_numpy(dtype=float),
+            daily['temperature_max'].to_numpy(dtype=float),
+            daily['humidite'].to_numpy(dtype=float),
+            daily['vitesse_vent'].to_numpy(dtype=float),
+            daily['rayonnement_solaire'].to_numpy(dtype=float) * HOURLY_WM2_TO_MJ,
+            station_latitude,
+            daily.index.dayofyear.to_numpy(),
+            altitude, wind_height)
+    return derived
@@ -0,0 +1,48 @@
+# bench_load_data.py
+# Compare le démarrage à froid (lecture des CSV) et le démarrage à chaud
+# (lecture mappée du cache colonnaire) de AgriculturalDataManager.load_data
+
+import shutil
+import tempfile
+import time
+
+from data_manager import AgriculturalDataManager
+
+
+def time_load(cache_dir, use_cache=True):
+    """Mesure la durée d'un appel à load_data"""
+    manager = AgriculturalDataManager(cache_dir=cache_dir, use_cache=use_cache)
+    start = time.perf_counter()
+    manager.load_data()
+    return time.perf_counter() - start
+
+
+def run_benchmark(repeat=5):
+    """Exécute le benchmark et affiche les durées médianes"""
+    cache_dir = tempfile.mkdtemp(prefix='agri_cache_')
+    try:
+        csv_times = [time_load(cache_dir, use_cache=False) for _ in range(repeat)]
+
+        # Démarrage à froid : cache vide, lecture CSV puis écriture du cache
+        cold_times = []
+        for _ in range(repeat):
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            cold_times.append(time_load(cache_dir))
+
+        # Démarrage à chaud : le cache est valide
+        warm_times = [time_load(cache_dir) for _ in range(repeat)]
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def median(values):
+        return sorted(values)[len(values) // 2]
+
+    print()
+    print(f"CSV sans cache        : {median(csv_times) * 1000:8.1f} ms")
+    print(f"Démarrage à froid     : {median(cold_times) * 1000:8.1f} ms")
+    print(f"Démarrage à chaud     : {median(warm_times) * 1000:8.1f} ms")
+    print(f"Accélération (chaud)  : {median(csv_times) / median(warm_times):8.1f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
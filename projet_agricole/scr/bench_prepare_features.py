@@ -0,0 +1,59 @@
+# bench_prepare_features.py
+# Mesure le passage à l'échelle de prepare_features en fonction du nombre
+# de processus, sur un jeu de monitoring agrandi par duplication des parcelles
+
+import os
+import time
+
+import pandas as pd
+
+from data_manager import AgriculturalDataManager
+
+
+def build_manager(copies):
+    """Gestionnaire dont les parcelles (monitoring et sol) sont dupliquées copies fois"""
+    manager = AgriculturalDataManager()
+    monitoring, soil = manager.monitoring_data, manager.soil_data
+
+    def replicate(frame):
+        parts = []
+        for copy in range(copies):
+            part = frame.copy()
+            part['parcelle_id'] = part['parcelle_id'].astype(str) + f'_{copy}'
+            parts.append(part)
+        return pd.concat(parts)
+
+    manager.soil_data = replicate(soil).reset_index(drop=True)
+    manager.monitoring_data = replicate(monitoring)
+    manager.fit_feature_pipeline()
+    return manager
+
+
+def time_prepare(manager, n_jobs, repeat=3):
+    """Durée médiane d'un appel à prepare_features sur tout le monitoring"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        manager.prepare_features(manager.monitoring_data, n_jobs=n_jobs)
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2]
+
+
+def run_benchmark(copies=20, max_jobs=None):
+    """Exécute le benchmark et affiche durées et accélérations par nombre de processus"""
+    manager = build_manager(copies)
+    max_jobs = max_jobs or os.cpu_count() or 1
+    jobs = sorted({1} | {n for n in (2, 4, 8, 16, 32) if n <= max_jobs} | {max_jobs})
+
+    rows, parcels = len(manager.monitoring_data), manager.soil_data['parcelle_id'].nunique()
+    print()
+    print(f"{rows} lignes de monitoring, {parcels} parcelles")
+    reference = time_prepare(manager, 1)
+    print(f"Séquentiel            : {reference * 1000:8.1f} ms")
+    for n_jobs in jobs[1:]:
+        duration = time_prepare(manager, n_jobs)
+        print(f"{n_jobs:3d} processus         : {duration * 1000:8.1f} ms  ({reference / duration:4.1f}x)")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,209 @@
+# bench_suite.py
+# Suite de benchmarks : durée médiane et pics mémoire (tracemalloc pour les
+# allocations Python et numpy, pool mémoire d'Arrow à part) des étapes
+# principales du système sur des jeux synthétiques de taille croissante
+# (data_generator.py). Les résultats peuvent être enregistrés en JSON et
+# comparés à une exécution de référence pour repérer les régressions.
+#
+# Exemples :
+#   python bench_suite.py --parcels 50 200 1000 --output reference.json
+#   python bench_suite.py --parcels 50 200 1000 --compare reference.json
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow absent : pas de mesure des allocations Arrow
+    pa = None
+
+from dashboard import AgriculturalDashboard
+from data_generator import generate_dataset
+from data_manager import AgriculturalDataManager
+
+# Écarts absolus en dessous desquels une différence relève du bruit de mesure
+MIN_DIFF_MS = 5.0
+MIN_DIFF_MB = 1.0
+# analyze_yield_patterns décompose des séries mensuelles d'au moins 24 points
+MIN_YEARS = 2
+
+
+def measure(setup, func, repeat):
+    """
+    Durée médiane de func(setup()) sur repeat exécutions (setup non
+    chronométré), puis pics mémoire d'une exécution supplémentaire (mesurés
+    à part, tracemalloc ralentissant l'exécution) : allocations suivies par
+    tracemalloc, et allocations d'Arrow (lecture du cache, chaînes), que
+    tracemalloc ne voit pas, relevées sur le pool mémoire d'Arrow : pic
+    exact lorsque l'étape dépasse le plus haut niveau déjà atteint par le
+    pool, sinon mémoire Arrow encore allouée à la fin de l'étape.
+
+    Retourne (durée en s, pic tracemalloc, pic Arrow) ; pics en octets.
+    """
+    # Les messages d'avancement du système ne sont pas affichés
+    with contextlib.redirect_stdout(io.StringIO()):
+        times = []
+        for i in range(repeat):
+            argument = setup(i)
+            start = time.perf_counter()
+            func(argument)
+            times.append(time.perf_counter() - start)
+
+        argument = setup(repeat)
+        # Le pool d'Arrow n'est pas remplacé : des tampons lui survivraient
+        pool = None if pa is None else pa.default_memory_pool()
+        if pool is not None:
+            arrow_before, arrow_high = pool.bytes_allocated(), pool.max_memory()
+        tracemalloc.start()
+        try:
+            func(argument)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    arrow_peak = 0
+    if pool is not None:
+        if pool.max_memory() > arrow_high:
+            arrow_peak = pool.max_memory() - arrow_before
+        else:
+            arrow_peak = max(pool.bytes_allocated() - arrow_before, 0)
+    return float(np.median(times)), peak, arrow_peak
+
+
+def stages(data_root):
+    """
+    Étapes mesurées : (nom, préparation, étape). La préparation reçoit le
+    numéro de l'exécution, ce qui permet de changer de parcelle à chaque
+    exécution pour ne pas mesurer les caches
+    """
+    def new_manager(use_cache):
+        return lambda i: AgriculturalDataManager(data_root=data_root, use_cache=use_cache)
+
+    # Gestionnaire et tableau de bord partagés par les étapes d'analyse
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = AgriculturalDataManager(data_root=data_root)
+        manager.load_data()
+        manager.fit_feature_pipeline()
+        dashboard = AgriculturalDashboard(manager)
+    parcels = manager.get_parcel_ids()
+
+    def parcel(i):
+        return parcels[i % len(parcels)]
+
+    def cold_stress(i):
+        dashboard._stress_cache.clear()
+        return parcel(i)
+
+    return [
+        ('load_data (csv)', new_manager(False), lambda m: m.load_data()),
+        ('load_data (cache)', new_manager(True), lambda m: m.load_data()),
+        ('prepare_features', lambda i: manager.monitoring_data, manager.prepare_features),
+        ('analyze_yield_patterns', parcel, manager.analyze_yield_patterns),
+        ('prepare_stress_data', cold_stress, dashboard.prepare_stress_data),
+        ('update_plots', parcel, lambda p: dashboard.update_plots('value', None, p)),
+    ]
+
+
+def run_suite(sizes, years=5, repeat=5, seed=0):
+    """Génère chaque jeu de données, exécute les étapes et retourne les résultats"""
+    results = []
+    for n_parcels in sizes:
+        data_root = tempfile.mkdtemp(prefix='agri_bench_')
+        try:
+            counts = generate_dataset(data_root, n_parcels=n_parcels, years=years, seed=seed)
+            # Premier chargement : alimente le cache colonnaire
+            with contextlib.redirect_stdout(io.StringIO()):
+                AgriculturalDataManager(data_root=data_root).load_data()
+
+            print(f"\n{n_parcels} parcelles, {years} ans ({counts['monitoring_data']} lignes de monitoring)")
+            for name, setup, func in stages(data_root):
+                duration, peak, arrow_peak = measure(setup, func, repeat)
+                results.append({'stage': name, 'parcels': n_parcels, 'years': years,
+                                'rows': counts['monitoring_data'],
+                                'time_ms': duration * 1000, 'peak_mb': peak / 2 ** 20,
+                                'arrow_peak_mb': arrow_peak / 2 ** 20})
+                print(f"  {name:24s}: {duration * 1000:9.1f} ms  {peak / 2 ** 20:8.1f} Mo"
+                      f"  (Arrow {arrow_peak / 2 ** 20:6.1f} Mo)")
+        finally:
+            shutil.rmtree(data_root, ignore_errors=True)
+    return results
+
+
+def compare(results, reference, tolerance):
+    """
+    Compare les résultats à une exécution de référence et retourne les
+    étapes dont la durée ou le pic mémoire (tracemalloc et Arrow cumulés)
+    dépasse la référence de plus de tolerance (en proportion) et d'un
+    écart absolu significatif
+    """
+    def memory(result):
+        # Les références antérieures n'ont pas de mesure Arrow
+        return result['peak_mb'] + result.get('arrow_peak_mb', 0.0)
+
+    baseline = {(r['stage'], r['parcels'], r['years']): r for r in reference['results']}
+    regressions = []
+    print(f"\nComparaison avec la référence (tolérance {tolerance:.0%})")
+    for result in results:
+        key = (result['stage'], result['parcels'], result['years'])
+        if key not in baseline:
+            continue
+        time_ratio = result['time_ms'] / max(baseline[key]['time_ms'], 1e-9)
+        memory_ratio = memory(result) / max(memory(baseline[key]), 1e-9)
+        slower = time_ratio > 1 + tolerance \
+            and result['time_ms'] - baseline[key]['time_ms'] > MIN_DIFF_MS
+        larger = memory_ratio > 1 + tolerance \
+            and memory(result) - memory(baseline[key]) > MIN_DIFF_MB
+        regression = slower or larger
+        if regression:
+            regressions.append(result)
+        print(f"  {key[0]:24s} {key[1]:6d} parcelles : durée x{time_ratio:5.2f}, "
+              f"mémoire x{memory_ratio:5.2f}{'  <-- régression' if regression else ''}")
+    return regressions
+
+
+def years_count(value):
+    """Nombre d'années généré : au moins MIN_YEARS (décomposition saisonnière)"""
+    years = int(value)
+    if years < MIN_YEARS:
+        raise argparse.ArgumentTypeError(
+            f"au moins {MIN_YEARS} ans sont nécessaires (décomposition saisonnière sur 24 mois)")
+    return years
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks du système agricole.")
+    parser.add_argument('--parcels', type=int, nargs='+', default=[50, 200, 1000],
+                        help="tailles (nombre de parcelles) des jeux synthétiques")
+    parser.add_argument('--years', type=years_count, default=5,
+                        help=f"nombre d'années générées (au moins {MIN_YEARS})")
+    parser.add_argument('--repeat', type=int, default=5, help="exécutions par étape")
+    parser.add_argument('--output', help="fichier JSON où enregistrer les résultats")
+    parser.add_argument('--compare', help="fichier JSON de référence")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="écart relatif toléré avant de signaler une régression")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.parcels, args.years, args.repeat)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump({'python': platform.python_version(), 'pandas': pd.__version__,
+                       'numpy': np.__version__, 'results': results}, handle, indent=2)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as handle:
+            regressions = compare(results, json.load(handle), args.tolerance)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,53 @@
 from bokeh.layouts import column, row, gridplot
 from bokeh.models import ColumnDataSource, Select, DateRangeSlider, HoverTool, ColorBar, LinearColorMapper
+from bokeh.events import RangesUpdate
 from bokeh.plotting import figure
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import pandas as pd
 from bokeh.palettes import RdYlBu11 as palette
 import bokeh.plotting as bk
 from bokeh.models import Select
 from data_manager import AgriculturalDataManager
+from stress import stress_contingency
+from downsampling import downsample
+from instrumentation import INSTRUMENTATION, instrumented
+from payload_cache import shared_payload_cache
 
 
 
+# Seuils de NDVI affichés sur le graphique temporel
+NDVI_SEUIL_BAS = 0.4
+NDVI_SEUIL_HAUT = 0.7
+
+# Largeur des graphiques temporels et colonne servant au sous-échantillonnage
+PLOT_WIDTH = 800
+LOD_COLUMNS = {'monitoring_data': 'ndvi', 'yield_history': 'rendement_estime'}
+
+# Valeur de parcelle_id désignant l'ensemble des parcelles (prepare_stress_data)
+ALL_PARCELS = object()
+
+# Threads de calcul des rafraîchissements, partagés par toutes les sessions
+REFRESH_WORKERS = 4
+_refresh_executor = None
+_refresh_executor_lock = threading.Lock()
+
+
+def refresh_executor():
+    """Exécuteur partagé des rafraîchissements en arrière-plan (créé au premier appel)"""
+    global _refresh_executor
+    with _refresh_executor_lock:
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS,
+                                                   thread_name_prefix='dashboard-refresh')
+        return _refresh_executor
+
+
 class AgriculturalDashboard:
-    def __init__(self, data_manager):
+    def __init__(self, data_manager, parcelle_id=None, rollover=None,
+                 points_per_pixel=1.0, lod_method='lttb', executor=None, payload_cache=None,
+                 interactive=True):
         """
         Initialise le tableau de bord avec le gestionnaire de données.
 
@@ -19,27 +56,169 @@ class AgriculturalDashboard:
         - L’historique des rendements
         - Les données météorologiques
         - Les caractéristiques des sols
+
+        Seules les données de la parcelle sélectionnée (parcelle_id, par
+        défaut la première) sont envoyées au navigateur ; rollover borne
+        le nombre de points conservés lors de l'envoi de nouvelles
+        observations.
+
+        Les séries longues sont sous-échantillonnées côté serveur
+        (lod_method : 'lttb' ou 'minmax') à points_per_pixel points par
+        pixel de largeur, sur la période visible ; un zoom recalcule la
+        série à pleine résolution sur la nouvelle fenêtre.
+
+        Une fois le tableau de bord attaché à un document serveur (attach),
+        le changement de parcelle est calculé en arrière-plan sur executor
+        (par défaut l'exécuteur partagé refresh_executor()) puis appliqué au
+        document au tick suivant ; les demandes rapprochées sont regroupées
+        et seule la dernière parcelle demandée est affichée.
+
+        Les données préparées de chaque parcelle consultée sont conservées
+        dans payload_cache (PayloadCache, borné en octets et vidé à chaque
+        modification des données ; par défaut le cache partagé par toutes
+        les sessions du processus, shared_payload_cache()) ;
+        payload_cache.stats() donne les succès et échecs du cache.
+
+        interactive=False construit une mise en page statique (export HTML,
+        voir export_dashboards.py) : ni sélecteur de parcelle, ni curseur de
+        période, ni rappels Python sur les axes.
         """
         self.data_manager = data_manager
         # self.data_manager = AgriculturalDataManager()
         self.source = None
         self.hist_source = None
-        self.selected_parcelle = None
+        self.threshold_source = None
+        self.stress_source = None
+        self.stress_mapper = None
+        self.selected_parcelle = parcelle_id
+        self.rollover = rollover
+        self.points_per_pixel = points_per_pixel
+        self.lod_method = lod_method
+        self.interactive = interactive
+        self._full = {}     # Séries à pleine résolution de la parcelle, par jeu de données
+        self._windows = {}  # Période visible (début, fin), par jeu de données
+        self._suppress_range = False  # Axes recalés par le serveur : pas de recalcul
+        self.yield_plot = None
+        self.ndvi_plot = None
+        self.date_slider = None
+        self._stress_cache = {}  # Tables de stress par parcelle
+        self._stress_cache_version = None
+        self._pending = []  # Observations ajoutées, en attente d'envoi
+        self._pending_lock = threading.Lock()
+        self._periodic_callback = None
+        self._doc = None  # Document serveur, fixé par attach()
+        self._executor = executor
+        self.payload_cache = payload_cache if payload_cache is not None else shared_payload_cache()
+        self._refresh_lock = threading.RLock()
+        self._refresh_token = 0      # Numéro de la dernière demande de rafraîchissement
+        self._refresh_request = None  # Demande en attente (numéro, parcelle)
+        self._refresh_future = None   # Calcul en cours
+        self.data_manager.add_append_listener(self._on_append)
         self.create_data_sources()
 
     def create_data_sources(self):
         """
         Prépare les sources de données pour Bokeh en intégrant
-        les données actuelles et historiques.
+        les données actuelles et historiques de la parcelle sélectionnée.
         """
         if self.data_manager.yield_history is None:
             raise ValueError("yield_history is not loaded in data_manager.")
         if self.data_manager.monitoring_data is None:
             raise ValueError("monitoring_data is not loaded in data_manager.")
-        yield_history_df = self.data_manager.yield_history.reset_index(drop=True)
-        monitoring_data_df = self.data_manager.monitoring_data.reset_index(drop=True)
-        self.hist_source = ColumnDataSource(yield_history_df)
-        self.source = ColumnDataSource(monitoring_data_df)
+        if self.selected_parcelle is None:
+            parcelle_ids = self.get_parcelle_options()
+            self.selected_parcelle = parcelle_ids[0] if parcelle_ids else None
+
+        self._load_parcel(self.selected_parcelle)
+        self.source = ColumnDataSource(self._lod_data('monitoring_data'))
+        self.hist_source = ColumnDataSource(self._lod_data('yield_history'))
+        self.threshold_source = ColumnDataSource(self._threshold_data())
+        self.stress_source = ColumnDataSource(
+            data={'stress_hydrique_level': [], 'stress_type': [], 'count': []})
+
+    @staticmethod
+    def _source_data(frame):
+        """
+        Convertit un jeu de données en colonnes pour ColumnDataSource,
+        la date étant reprise de l'index temporel
+        """
+        data = {}
+        if isinstance(frame.index, pd.DatetimeIndex):
+            data['date'] = frame.index.to_numpy()
+            frame = frame.drop(columns='date', errors='ignore')
+        for column in frame.columns:
+            values = frame[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype(str)
+            data[column] = values.to_numpy()
+        return data
+
+    @instrumented(rows=None)
+    def _parcel_frames(self, parcelle_id):
+        """Séries complètes de la parcelle, par jeu de données"""
+        frames = {}
+        for dataset in LOD_COLUMNS:
+            frame = self.data_manager.get_parcel_slice(dataset, parcelle_id)
+            if isinstance(frame.index, pd.DatetimeIndex) and not frame.index.is_monotonic_increasing:
+                frame = frame.sort_index(kind='mergesort')
+            frames[dataset] = frame
+        return frames
+
+    def _load_parcel(self, parcelle_id):
+        """Conserve côté serveur les séries complètes de la parcelle"""
+        self._full = self._parcel_frames(parcelle_id)
+        self._windows = {}
+
+    @property
+    def point_budget(self):
+        """Nombre maximal de points envoyés par série"""
+        return max(int(PLOT_WIDTH * self.points_per_pixel), 3)
+
+    @instrumented(rows=lambda data: len(next(iter(data.values()), ())))
+    def _lod_data(self, dataset, frame=None):
+        """
+        Série de la parcelle sur la période visible, sous-échantillonnée
+        (frame : série à utiliser, sur toute sa période, à la place de la
+        série courante)
+        """
+        if frame is None:
+            frame, (start, end) = self._full[dataset], self._windows.get(dataset, (None, None))
+        else:
+            start, end = None, None
+        y_column = LOD_COLUMNS[dataset]
+        if y_column not in frame.columns or not isinstance(frame.index, pd.DatetimeIndex):
+            return self._source_data(frame)
+        return self._source_data(
+            downsample(frame, y_column, self.point_budget, start, end, method=self.lod_method))
+
+    def _visible_count(self, dataset):
+        """Nombre de points de la série complète dans la période visible"""
+        frame = self._full[dataset]
+        start, end = self._windows.get(dataset, (None, None))
+        if not isinstance(frame.index, pd.DatetimeIndex) or (start is None and end is None):
+            return len(frame)
+        return len(frame.loc[start:end])
+
+    def _on_range_change(self, dataset, start, end):
+        """
+        Recalcule la série affichée lors d'un zoom ou d'un déplacement
+        (start, end : bornes de l'axe, en millisecondes ou en dates)
+        """
+        if self._suppress_range or start is None or end is None:
+            return
+        window = tuple(pd.Timestamp(bound, unit='ms') if isinstance(bound, (int, float))
+                       else pd.Timestamp(bound) for bound in (start, end))
+        if self._windows.get(dataset) == window:
+            return
+        self._windows[dataset] = window
+        source = self.source if dataset == 'monitoring_data' else self.hist_source
+        source.data = self._lod_data(dataset)
+
+    def _threshold_data(self):
+        """Extrémités des lignes de seuil NDVI, alignées sur les dates de la parcelle"""
+        dates = self._full['monitoring_data'].index
+        x = [dates.min(), dates.max()] if len(dates) > 0 else []
+        return {'x': x, 'bas': [NDVI_SEUIL_BAS] * len(x), 'haut': [NDVI_SEUIL_HAUT] * len(x)}
 
     def create_yield_history_plot(self):
         """
@@ -49,11 +228,17 @@ class AgriculturalDashboard:
             title="Historique des Rendements par Parcelle",
             x_axis_type="datetime",
             height=400,
-            width=800,
+            width=PLOT_WIDTH,
             x_axis_label="Date",
             y_axis_label="Rendement Estimé (t/ha)"
         )
 
+        # Sous-échantillonnage recalculé sur la période visible
+        if self.interactive:
+            # Un seul événement par zoom ou déplacement (et non un par borne)
+            p.on_event(RangesUpdate, lambda event: self._on_range_change('yield_history', event.x0, event.x1))
+        self.yield_plot = p
+
         # Utiliser la source globale pour les données
         p.line('date', 'rendement_estime', source=self.hist_source, line_width=2, color='blue', legend_label="Parcelle")
         p.circle('date', 'rendement_estime', source=self.hist_source, size=6, color='blue', alpha=0.5)
@@ -76,23 +261,25 @@ class AgriculturalDashboard:
             title="Évolution du NDVI et Seuils Historiques",
             x_axis_type="datetime",
             height=400,
-            width=800,
+            width=PLOT_WIDTH,
             x_axis_label="Date",
             y_axis_label="NDVI"
         )
 
+        # Sous-échantillonnage recalculé sur la période visible
+        if self.interactive:
+            p.on_event(RangesUpdate, lambda event: self._on_range_change('monitoring_data', event.x0, event.x1))
+        self.ndvi_plot = p
+
         # Utiliser la source globale pour les données
         p.line('date', 'ndvi', source=self.source, line_width=2, color='green', legend_label="NDVI")
         p.circle('date', 'ndvi', source=self.source, size=6, color='green', alpha=0.6)
 
-        # Déterminer les limites temporelles
-        if len(self.source.data['date']) > 0:
-            x_start = min(self.source.data['date'])
-            x_end = max(self.source.data['date'])
-
-            # Ajouter les seuils comme lignes indépendantes
-            p.line(x=[x_start, x_end], y=[0.4, 0.4], color='red', line_dash='dashed', legend_label="Seuil Bas (0.4)")
-            p.line(x=[x_start, x_end], y=[0.7, 0.7], color='blue', line_dash='dashed', legend_label="Seuil Élevé (0.7)")
+        # Ajouter les seuils, bornés aux dates de la parcelle affichée
+        p.line('x', 'bas', source=self.threshold_source, color='red', line_dash='dashed',
+               legend_label=f"Seuil Bas ({NDVI_SEUIL_BAS})")
+        p.line('x', 'haut', source=self.threshold_source, color='blue', line_dash='dashed',
+               legend_label=f"Seuil Élevé ({NDVI_SEUIL_HAUT})")
 
         # Ajouter des interactions
         hover = HoverTool(tooltips=[("Date", "@date{%F}"), ("NDVI", "@ndvi"), ("Parcelle", "@parcelle_id")], formatters={"@date": "datetime"})
@@ -114,6 +301,8 @@ class AgriculturalDashboard:
             return figure(title="Matrice de Stress (Données indisponibles)", height=400, width=400)
 
         mapper = LinearColorMapper(palette=palette, low=stress_data['count'].min(), high=stress_data['count'].max())
+        self.stress_mapper = mapper
+        self.stress_source.data = {column: stress_data[column].tolist() for column in stress_data.columns}
 
         p = figure(
             title="Matrice de Stress",
@@ -129,7 +318,7 @@ class AgriculturalDashboard:
             y="stress_hydrique_level",
             width=1,
             height=1,
-            source=ColumnDataSource(stress_data),
+            source=self.stress_source,
             fill_color={"field": "count", "transform": mapper},
             line_color=None
         )
@@ -150,6 +339,10 @@ class AgriculturalDashboard:
         """
         Organise tous les graphiques et le widget de sélection dans une mise en page.
         """
+        if not self.interactive:
+            return column(self.create_yield_history_plot(), self.create_ndvi_temporal_plot(),
+                          self.create_stress_matrix())
+
         parcelle_selector = self.create_parcelle_selector()
 
         if parcelle_selector is None:
@@ -159,9 +352,10 @@ class AgriculturalDashboard:
         yield_plot = self.create_yield_history_plot()
         ndvi_plot = self.create_ndvi_temporal_plot()
         stress_matrix = self.create_stress_matrix()
+        date_slider = self.create_date_range_slider()
 
         # Ajoutez le sélecteur en haut de la page
-        layout = column(parcelle_selector, yield_plot, ndvi_plot, stress_matrix)
+        layout = column(parcelle_selector, date_slider, yield_plot, ndvi_plot, stress_matrix)
         return layout
 
 
@@ -194,38 +388,41 @@ class AgriculturalDashboard:
     #     stress_data = data.groupby(['stress_hydrique_level', 'stress_type']).size().reset_index(name='count')
     #     return stress_data
 
-    def prepare_stress_data(self):
+    @instrumented()
+    def prepare_stress_data(self, parcelle_id=None):
         """
         Prépare les données pour la matrice de stress.
+
+        parcelle_id : parcelle à analyser (par défaut la parcelle
+        sélectionnée), ou ALL_PARCELS pour l'ensemble du jeu de données.
+        La table de contingence est mise en cache par version des données
+        et par parcelle.
         """
-        # Pass monitoring_data or any relevant DataFrame to prepare_features
-        data = self.data_manager.prepare_features(self.data_manager.monitoring_data)
+        if parcelle_id is None:
+            parcelle_id = self.selected_parcelle
+        version = self.data_manager.data_version
+        if version != self._stress_cache_version:
+            self._stress_cache = {}
+            self._stress_cache_version = version
+        if parcelle_id in self._stress_cache:
+            return self._stress_cache[parcelle_id]
+
+        if parcelle_id is ALL_PARCELS or parcelle_id is None:
+            monitoring = self.data_manager.monitoring_data
+        else:
+            monitoring = self.data_manager.get_parcel_slice('monitoring_data', parcelle_id)
 
-        # Renommer les colonnes ambiguës si nécessaire
-        if 'date_x' in data.columns or 'date_y' in data.columns:
-            data.rename(columns={'date_x': 'date', 'date_y': 'date_meteo'}, inplace=True)
+        # Fusion avec la météo, sans normalisation : les seuils s'appliquent en °C
+        data = self.data_manager.merge_features(monitoring)
 
         # Vérifier les colonnes nécessaires
         if 'stress_hydrique' not in data.columns or 'temperature' not in data.columns:
             print("Colonnes nécessaires manquantes dans les données.")
             return pd.DataFrame()
 
-        # Remplir les valeurs manquantes
-        data['stress_hydrique'].fillna(0, inplace=True)
-        data['temperature'].fillna(data['temperature'].mean(), inplace=True)
-
-        # Catégoriser les niveaux de stress
-        data['stress_hydrique_level'] = pd.cut(
-            data['stress_hydrique'],
-            bins=[0, 0.05, 0.1, 1],
-            labels=["Faible", "Modéré", "Élevé"]
-        )
-        data['stress_type'] = data['temperature'].apply(
-            lambda x: "Conditions Météo" if x > 30 or x < 5 else "Stress Hydrique"
-        )
-
         # Compter les occurrences pour chaque catégorie
-        stress_data = data.groupby(['stress_hydrique_level', 'stress_type']).size().reset_index(name='count')
+        stress_data = stress_contingency(data['stress_hydrique'], data['temperature'])
+        self._stress_cache[parcelle_id] = stress_data
         return stress_data
 
 
@@ -234,8 +431,8 @@ class AgriculturalDashboard:
         Retourne la liste des parcelles disponibles dans les données de monitoring.
         """
         if self.data_manager.monitoring_data is not None:
-            # Récupère les parcelles uniques
-            return sorted(self.data_manager.monitoring_data['parcelle_id'].unique())
+            # Récupère les parcelles depuis l'index par parcelle
+            return self.data_manager.get_parcel_ids('monitoring_data')
         else:
             print("Erreur : Les données de monitoring ne sont pas chargées.")
             return []
@@ -248,29 +445,259 @@ class AgriculturalDashboard:
         parcelle_ids = self.get_parcelle_options()
         parcelle_selector = Select(
             title="Sélectionnez une parcelle",
-            value=parcelle_ids[0],  # Première parcelle par défaut
+            value=self.selected_parcelle or parcelle_ids[0],  # Première parcelle par défaut
             options=parcelle_ids    # Liste des parcelles
         )
         parcelle_selector.on_change('value', self.update_plots)  # Lien avec le callback
         return parcelle_selector
 
 
+    def _date_bounds(self):
+        """Première et dernière date des séries de la parcelle"""
+        dates = [frame.index for frame in self._full.values()
+                 if isinstance(frame.index, pd.DatetimeIndex) and len(frame) > 0]
+        if not dates:
+            return None
+        return min(d.min() for d in dates), max(d.max() for d in dates)
+
+    def create_date_range_slider(self):
+        """
+        Crée un curseur de période qui règle la fenêtre visible des
+        graphiques temporels (et donc la résolution des séries envoyées)
+        """
+        bounds = self._date_bounds()
+        if bounds is None:
+            return None
+        start, end = bounds
+        self.date_slider = DateRangeSlider(title="Période", start=start, end=end,
+                                           value=(start, end), width=PLOT_WIDTH)
+        self.date_slider.on_change('value_throttled', self._on_period_change)
+        return self.date_slider
+
+    def _on_period_change(self, attr, old, new):
+        """
+        Applique la période choisie aux graphiques temporels (les axes
+        modifiés par le serveur n'émettent pas RangesUpdate : les séries
+        sont recalculées ici, une fois par graphique)
+        """
+        start, end = new
+        for dataset, plot in (('yield_history', self.yield_plot), ('monitoring_data', self.ndvi_plot)):
+            if plot is not None:
+                plot.x_range.start = start
+                plot.x_range.end = end
+                self._on_range_change(dataset, start, end)
+
+    @instrumented(rows=None)
     def update_plots(self, attr, old, new):
         """
         Met à jour les graphiques lorsqu'une nouvelle parcelle est sélectionnée.
         """
         parcelle_id = new  # Nouvelle valeur sélectionnée dans le sélecteur
+        self.selected_parcelle = parcelle_id
         print(f"Parcelle sélectionnée : {parcelle_id}")
 
-        # Filtrer les données de monitoring et d'historique pour la parcelle sélectionnée
-        updated_monitoring_data = self.data_manager.monitoring_data[self.data_manager.monitoring_data['parcelle_id'] == parcelle_id]
-        updated_yield_history = self.data_manager.yield_history[self.data_manager.yield_history['parcelle_id'] == parcelle_id]
+        if self._doc is not None:
+            # Sur un serveur, le calcul ne bloque pas la boucle d'événements
+            self.request_refresh(parcelle_id)
+            return
+        self._apply_refresh(self._compute_refresh(parcelle_id))
 
-        # Mettre à jour les sources de données
-        self.source.data = ColumnDataSource.from_df(updated_monitoring_data)
-        self.hist_source.data = ColumnDataSource.from_df(updated_yield_history)
+    def request_refresh(self, parcelle_id):
+        """
+        Demande le rafraîchissement des graphiques pour une parcelle.
 
-        print("Sources de données mises à jour pour la parcelle :", parcelle_id)
+        Les données sont calculées en arrière-plan puis appliquées au
+        document au tick suivant. Une seule demande est calculée à la fois :
+        une demande encore en file d'attente est annulée, et pendant un
+        calcul seule la dernière demande est conservée, les résultats
+        devenus obsolètes n'étant jamais appliqués.
+        """
+        with self._refresh_lock:
+            self._refresh_token += 1
+            self._refresh_request = (self._refresh_token, parcelle_id)
+            future = self._refresh_future
+            if future is not None and not future.done() and not future.cancel():
+                return  # Calcul en cours : la demande sera traitée à sa fin
+            self._submit_refresh()
+
+    def _submit_refresh(self):
+        """Lance le calcul de la demande en attente (appelé sous _refresh_lock)"""
+        token, parcelle_id = self._refresh_request
+        self._refresh_request = None
+        executor = self._executor or refresh_executor()
+        self._refresh_future = executor.submit(self._compute_refresh, parcelle_id)
+        self._refresh_future.add_done_callback(partial(self._on_refresh_done, token))
+
+    def _on_refresh_done(self, token, future):
+        """Fin d'un calcul : application au tick suivant, puis demande suivante"""
+        if future.cancelled():
+            return
+        with self._refresh_lock:
+            if future is self._refresh_future:
+                self._refresh_future = None
+                if self._refresh_request is not None:
+                    self._submit_refresh()
+            current = token == self._refresh_token
+        if not current or self._doc is None:
+            return
+        error = future.exception()
+        if error is not None:
+            print(f"Erreur lors du rafraîchissement de la parcelle : {error}")
+            return
+        self._doc.add_next_tick_callback(partial(self._apply_refresh, future.result(), token))
+
+    @instrumented(rows=None)
+    def _compute_refresh(self, parcelle_id):
+        """
+        Calculs d'un changement de parcelle, sans toucher au document :
+        séries complètes, séries sous-échantillonnées et matrice de stress
+        (repris du cache si la parcelle a déjà été préparée)
+        """
+        # Cache partagé entre sessions : la version désigne aussi le gestionnaire
+        # (référencé, donc jamais confondu avec un gestionnaire recréé à la même adresse)
+        version = (self.data_manager, self.data_manager.data_version)
+        key = (parcelle_id, self.point_budget, self.lod_method, self.stress_mapper is not None)
+        refresh = self.payload_cache.get(key, version)
+        if refresh is None:
+            refresh = self._prepare_refresh(parcelle_id)
+            self.payload_cache.put(key, refresh, version)
+        return refresh
+
+    def _prepare_refresh(self, parcelle_id):
+        """Prépare les données d'une parcelle pour _compute_refresh"""
+        frames = self._parcel_frames(parcelle_id)
+        stress = None if self.stress_mapper is None else self.prepare_stress_data(parcelle_id)
+        return {
+            'parcelle_id': parcelle_id,
+            'frames': frames,
+            # Seule la parcelle, sous-échantillonnée, est envoyée au navigateur
+            'monitoring_data': self._lod_data('monitoring_data', frames['monitoring_data']),
+            'yield_history': self._lod_data('yield_history', frames['yield_history']),
+            'stress': stress,
+        }
+
+    @instrumented(rows=None)
+    def _apply_refresh(self, refresh, token=None):
+        """Applique au document un rafraîchissement calculé par _compute_refresh"""
+        if token is not None and token != self._refresh_token:
+            return  # Une parcelle plus récente a été demandée entre-temps
+        # Copies superficielles : les données en cache ne sont jamais modifiées
+        self._full = dict(refresh['frames'])
+        self._windows = {}
+        with INSTRUMENTATION.stage('AgriculturalDashboard.update_plots.sources'):
+            self.source.data = dict(refresh['monitoring_data'])
+            self.hist_source.data = dict(refresh['yield_history'])
+        self._refresh_thresholds()
+        self._refresh_date_slider()
+        if refresh['stress'] is not None:
+            self._apply_stress(refresh['stress'])
+
+        print("Sources de données mises à jour pour la parcelle :", refresh['parcelle_id'])
+
+    def _refresh_thresholds(self):
+        """Recale les lignes de seuil sur les dates affichées"""
+        data = self._threshold_data()
+        if len(data['x']) == len(self.threshold_source.data['x']):
+            self.threshold_source.patch({'x': [(slice(0, len(data['x'])), data['x'])]})
+        else:
+            self.threshold_source.data = data
+
+    def _refresh_date_slider(self):
+        """Recale le curseur de période sur les dates de la parcelle"""
+        bounds = self._date_bounds()
+        if self.date_slider is None or bounds is None:
+            return
+        self.date_slider.update(start=bounds[0], end=bounds[1], value=bounds)
+        # Une période fixée pour la parcelle précédente est ramenée à la
+        # nouvelle. Les séries envoyées couvrent déjà toute la période de la
+        # parcelle : les axes sont recalés sans recalcul des séries
+        if any(plot is not None and plot.x_range.start is not None
+               for plot in (self.yield_plot, self.ndvi_plot)):
+            self._suppress_range = True
+            try:
+                self._on_period_change('value', None, bounds)
+            finally:
+                self._suppress_range = False
+            self._windows = {}
+
+    def _refresh_stress(self):
+        """Met à jour les comptes de la matrice de stress (même grille, seuls les comptes changent)"""
+        if self.stress_mapper is None:
+            return
+        self._apply_stress(self.prepare_stress_data())
+
+    def _apply_stress(self, stress_data):
+        """Applique une table de contingence à la matrice de stress"""
+        if stress_data.empty:
+            return
+        counts = stress_data['count'].tolist()
+        if len(counts) == len(self.stress_source.data['count']):
+            self.stress_source.patch({'count': [(slice(0, len(counts)), counts)]})
+        else:
+            self.stress_source.data = {column: stress_data[column].tolist() for column in stress_data.columns}
+        self.stress_mapper.update(low=min(counts), high=max(counts))
+
+    def _on_append(self, dataset, rows):
+        """Reçoit les observations ajoutées au gestionnaire de données"""
+        with self._pending_lock:
+            self._pending.append((dataset, rows))
+
+    @instrumented(rows=None)
+    def push_new_observations(self):
+        """
+        Envoie au navigateur les seules nouvelles observations de la parcelle
+        sélectionnée (ColumnDataSource.stream), sans renvoyer l'historique
+        """
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+
+        changed = False
+        for dataset, rows in pending:
+            if dataset == 'weather_data':
+                changed = True
+                continue
+            source = {'monitoring_data': self.source, 'yield_history': self.hist_source}.get(dataset)
+            if source is None:
+                continue
+            rows = rows[rows['parcelle_id'] == self.selected_parcelle]
+            if rows.empty:
+                continue
+            self._full[dataset] = pd.concat([self._full[dataset], rows])
+            if self._visible_count(dataset) <= self.point_budget:
+                source.stream(self._source_data(rows), rollover=self.rollover)
+            else:
+                # Au-delà du budget de points, la série visible est recalculée
+                source.data = self._lod_data(dataset)
+            changed = True
+
+        if changed:
+            self._refresh_thresholds()
+            self._refresh_stress()
+
+    def attach(self, doc, period_ms=5000):
+        """
+        Ajoute le tableau de bord à un document Bokeh serveur et programme
+        l'envoi périodique des nouvelles observations. Les changements de
+        parcelle sont dès lors calculés en arrière-plan (request_refresh).
+        """
+        layout = self.create_layout()
+        doc.add_root(layout)
+        self._doc = doc
+        self._periodic_callback = doc.add_periodic_callback(self.push_new_observations, period_ms)
+        doc.on_session_destroyed(lambda session_context: self.close())
+        return layout
+
+    def close(self):
+        """
+        Cesse de recevoir les nouvelles observations du gestionnaire de
+        données et abandonne les rafraîchissements en attente
+        """
+        self.data_manager.remove_append_listener(self._on_append)
+        with self._refresh_lock:
+            self._refresh_request = None
+            if self._refresh_future is not None:
+                self._refresh_future.cancel()
+        self._doc = None
 
 class MockDataManager:
     def __init__(self):
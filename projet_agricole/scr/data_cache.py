@@ -0,0 +1,405 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow absent : repli sur la lecture CSV
+    feather = None
+
+
+# Nom de colonne utilisé pour stocker l'index dans le fichier colonnaire
+INDEX_COLUMN = '__index__'
+CACHE_FORMAT_VERSION = 4
+
+# Nombre de lignes par lot du fichier colonnaire. Les bornes de dates et de
+# parcelles de chaque lot, conservées dans les métadonnées, permettent de ne
+# lire que les lots concernés par un filtre.
+BATCH_ROWS = 16384
+PARCEL_COLUMN = 'parcelle_id'
+
+
+class ColumnarCache:
+    def __init__(self, cache_dir):
+        """
+        Initialise le cache colonnaire (Feather / Arrow IPC non compressé)
+        des jeux de données déjà normalisés.
+
+        Chaque entrée est invalidée lorsque le fichier source change
+        (date de modification, taille puis empreinte SHA-1).
+        """
+        self.cache_dir = cache_dir
+
+    @property
+    def available(self):
+        """Indique si le format colonnaire est disponible (pyarrow installé)"""
+        return feather is not None
+
+    def _paths(self, name):
+        """Retourne les chemins du fichier de données et des métadonnées"""
+        return (os.path.join(self.cache_dir, f'{name}.feather'),
+                os.path.join(self.cache_dir, f'{name}.json'))
+
+    @staticmethod
+    def _file_hash(path, block_size=1 << 20):
+        """Calcule l'empreinte SHA-1 d'un fichier par blocs"""
+        digest = hashlib.sha1()
+        with open(path, 'rb') as handle:
+            for block in iter(lambda: handle.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _read_meta(self, name):
+        _, meta_path = self._paths(name)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def _replace(self, name, path, write):
+        """
+        Écrit un fichier de l'entrée via write(chemin temporaire) puis le
+        met en place atomiquement. Le fichier temporaire est propre à
+        chaque écriture : plusieurs processus peuvent remplir la même
+        entrée sans se gêner.
+        """
+        handle, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f'{name}.', suffix='.tmp')
+        os.close(handle)
+        try:
+            result = write(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return result
+
+    def _write_meta(self, name, meta):
+        _, meta_path = self._paths(name)
+
+        def write(tmp_path):
+            with open(tmp_path, 'w', encoding='utf-8') as handle:
+                json.dump(meta, handle, indent=2)
+
+        self._replace(name, meta_path, write)
+
+    def is_valid(self, name, source_path):
+        """
+        Vérifie que l'entrée du cache correspond toujours au fichier source.
+        La date de modification et la taille suffisent dans le cas courant ;
+        l'empreinte n'est recalculée que si la date a changé.
+        """
+        if not self.available:
+            return False
+        meta = self._read_meta(name)
+        data_path, _ = self._paths(name)
+        if meta is None or meta.get('version') != CACHE_FORMAT_VERSION \
+                or not os.path.exists(data_path):
+            return False
+
+        stat = os.stat(source_path)
+        if stat.st_size != meta['size']:
+            return False
+        if stat.st_mtime_ns == meta['mtime_ns']:
+            return True
+
+        # Fichier touché mais peut-être inchangé : on compare le contenu
+        if self._file_hash(source_path) != meta['sha1']:
+            return False
+        meta['mtime_ns'] = stat.st_mtime_ns
+        self._write_meta(name, meta)
+        return True
+
+    def load(self, name, source_path, columns=None, start=None, end=None, parcels=None,
+             zero_copy=False):
+        """
+        Charge un jeu de données depuis le cache (lecture mappée en mémoire).
+        Retourne None si l'entrée est absente ou périmée.
+
+        zero_copy=True construit les colonnes numériques et de dates
+        directement sur le fichier mappé, sans copie : elles sont en lecture
+        seule et leurs pages sont partagées par tous les processus qui
+        lisent la même entrée. Suppose une entrée écrite en un seul lot
+        (store(..., batch_rows=None)) ; sinon les lots sont concaténés.
+
+        columns limite les colonnes lues (les colonnes absentes du fichier
+        sont ignorées) ; start, end (dates de l'index) et parcels écartent
+        les lots dont les bornes excluent toute ligne demandée. Les lots
+        retenus sont retournés entiers : le filtrage exact des lignes reste
+        à la charge de l'appelant.
+        """
+        if not self.is_valid(name, source_path):
+            return None
+        data_path, _ = self._paths(name)
+        meta = self._read_meta(name)
+
+        # Les lots non retenus et les colonnes non lues ne sont jamais
+        # chargés depuis le fichier mappé
+        reader = pa.ipc.open_file(pa.memory_map(data_path))
+        if start is None and end is None and parcels is None:
+            selected = range(reader.num_record_batches)
+        else:
+            parcels = None if parcels is None else [str(p) for p in parcels]
+            selected = [i for i, stats in enumerate(meta['batches'])
+                        if self._batch_matches(stats, start, end, parcels)]
+        table = pa.Table.from_batches([reader.get_batch(i) for i in selected], schema=reader.schema)
+        if columns is not None:
+            keep = set(columns) | {INDEX_COLUMN}
+            table = table.select([column for column in table.column_names if column in keep])
+        if not zero_copy:
+            df = table.to_pandas()
+            if meta['has_index']:
+                df = df.set_index(INDEX_COLUMN).rename_axis(meta['index_name'])
+            return df
+
+        # Un bloc par colonne : les tableaux restent des vues du fichier mappé
+        df = table.to_pandas(split_blocks=True)
+        if meta['has_index']:
+            index = pd.Index(df.pop(INDEX_COLUMN).array, name=meta['index_name'], copy=False)
+            df = df.set_axis(index, axis=0)
+        return df
+
+    def store(self, name, source_path, df, batch_rows=BATCH_ROWS):
+        """
+        Enregistre un jeu de données normalisé dans le cache, par lots de
+        batch_rows lignes (None : un seul lot, pour une lecture sans copie)
+        """
+        if not self.available:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data_path, _ = self._paths(name)
+
+        has_index = not isinstance(df.index, pd.RangeIndex)
+        frame = df.rename_axis(INDEX_COLUMN).reset_index() if has_index \
+            else df.reset_index(drop=True)
+
+        # Écriture non compressée pour permettre le mappage mémoire ; les
+        # bornes des lots sont lues sur le fichier écrit par ce processus
+        def write(tmp_path):
+            feather.write_feather(frame, tmp_path, compression='uncompressed',
+                                  chunksize=batch_rows or max(len(frame), 1))
+            return self._batch_stats(tmp_path, has_index)
+
+        batches = self._replace(name, data_path, write)
+        self._write_entry_meta(name, source_path, has_index, df.index.name, batches)
+
+    def writer(self, name, source_path, batch_rows=BATCH_ROWS):
+        """
+        Ouvre l'écriture d'une entrée bloc par bloc (voir CacheWriter), pour
+        un jeu de données produit par morceaux
+        """
+        return CacheWriter(self, name, source_path, batch_rows)
+
+    def _write_entry_meta(self, name, source_path, has_index, index_name, batches):
+        """Métadonnées d'une entrée : état du fichier source, index et bornes des lots"""
+        stat = os.stat(source_path)
+        self._write_meta(name, {
+            'version': CACHE_FORMAT_VERSION,
+            'source': os.path.abspath(source_path),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha1': self._file_hash(source_path),
+            'has_index': has_index,
+            'index_name': index_name,
+            'batches': batches,
+        })
+
+    @staticmethod
+    def _batch_stats(data_path, has_index):
+        """
+        Bornes de chaque lot du fichier écrit : dates de l'index et
+        identifiants de parcelle (None si le lot n'a aucune valeur définie)
+        """
+        stats = []
+        with pa.memory_map(data_path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                entry = {'rows': batch.num_rows}
+                if has_index and pa.types.is_timestamp(batch.schema.field(INDEX_COLUMN).type):
+                    bounds = pc.min_max(batch.column(INDEX_COLUMN))
+                    entry['date_min'] = None if bounds['min'].as_py() is None \
+                        else pd.Timestamp(bounds['min'].as_py()).isoformat()
+                    entry['date_max'] = None if bounds['max'].as_py() is None \
+                        else pd.Timestamp(bounds['max'].as_py()).isoformat()
+                if PARCEL_COLUMN in batch.schema.names:
+                    bounds = pc.min_max(batch.column(PARCEL_COLUMN).cast(pa.string()))
+                    entry['parcel_min'] = bounds['min'].as_py()
+                    entry['parcel_max'] = bounds['max'].as_py()
+                stats.append(entry)
+        return stats
+
+    @staticmethod
+    def _batch_matches(stats, start, end, parcels):
+        """Indique si un lot peut contenir des lignes du filtre demandé"""
+        if (start is not None or end is not None) and 'date_min' in stats:
+            if stats['date_min'] is None:
+                return False
+            if start is not None and pd.Timestamp(stats['date_max']) < start:
+                return False
+            if end is not None and pd.Timestamp(stats['date_min']) > end:
+                return False
+        if parcels is not None and 'parcel_min' in stats:
+            if stats['parcel_min'] is None:
+                return False
+            return any(stats['parcel_min'] <= parcelle_id <= stats['parcel_max']
+                       for parcelle_id in parcels)
+        return True
+
+    def clear(self, name=None):
+        """Supprime une entrée (ou toutes les entrées) du cache"""
+        if name is not None:
+            names = [name]
+        elif os.path.isdir(self.cache_dir):
+            names = [os.path.splitext(f)[0] for f in os.listdir(self.cache_dir)
+                     if f.endswith('.json')]
+        else:
+            names = []
+
+        for entry in names:
+            for path in self._paths(entry):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+class CacheWriter:
+    def __init__(self, cache, name, source_path, batch_rows=BATCH_ROWS):
+        """
+        Écriture d'une entrée du cache colonnaire bloc par bloc, sans
+        conserver les blocs précédents en mémoire. Les blocs (write) doivent
+        avoir les mêmes colonnes ; comme pour un jeu normalisé en une fois,
+        un type entier devient flottant si un autre bloc est flottant, et
+        les colonnes catégorielles reçoivent l'ensemble trié des valeurs de
+        tous les blocs.
+
+        Les blocs sont d'abord écrits dans des flux temporaires, recodés à
+        la fermeture (close) dans le fichier de l'entrée, mis en place avec
+        ses métadonnées ; abort() abandonne l'écriture.
+        """
+        if not cache.available:
+            raise ValueError("Le cache colonnaire nécessite pyarrow.")
+        self.cache = cache
+        self.name = name
+        self.source_path = source_path
+        self.batch_rows = batch_rows
+        self.rows = 0
+        self._segments = []      # Flux temporaires, un par schéma successif
+        self._stream = None
+        self._schema = None
+        self._empty = None       # Bloc vide portant les types pandas des colonnes
+        self._categories = {}    # Valeurs rencontrées par colonne catégorielle
+        self._has_index = None
+        self._index_name = None
+
+    def _open_segment(self, schema):
+        """Commence un flux temporaire pour les blocs d'un schéma"""
+        if self._stream is not None:
+            self._stream.close()
+        os.makedirs(self.cache.cache_dir, exist_ok=True)
+        handle, path = tempfile.mkstemp(dir=self.cache.cache_dir, prefix=f'{self.name}.',
+                                        suffix='.tmp')
+        os.close(handle)
+        self._segments.append(path)
+        self._schema = schema
+        self._stream = pa.ipc.new_stream(path, schema)
+
+    def write(self, df):
+        """Ajoute un bloc à l'entrée"""
+        has_index = not isinstance(df.index, pd.RangeIndex)
+        if self._empty is not None and has_index != self._has_index:
+            raise ValueError(f"Les blocs de l'entrée {self.name} n'ont pas le même index.")
+        frame = df.rename_axis(INDEX_COLUMN).reset_index() if has_index \
+            else df.reset_index(drop=True)
+        if self._empty is None:
+            self._has_index = has_index
+            self._index_name = df.index.name
+            self._empty = frame.iloc[:0]
+            self._categories = {column: set() for column in frame.columns
+                                if isinstance(frame[column].dtype, pd.CategoricalDtype)}
+        # Les catégories ne sont fixées qu'à la fermeture : valeurs en clair
+        if self._categories:
+            frame = frame.copy()
+        for column, values in self._categories.items():
+            values.update(frame[column].cat.remove_unused_categories().cat.categories)
+            frame[column] = frame[column].astype(frame[column].cat.categories.dtype)
+
+        try:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._stream is None:
+                self._open_segment(table.schema)
+            elif not table.schema.equals(self._schema, check_metadata=False):
+                schema = pa.unify_schemas([self._schema, table.schema],
+                                          promote_options='permissive')
+                if not schema.equals(self._schema, check_metadata=False):
+                    # Type élargi (entier vers flottant) : nouveau flux
+                    self._open_segment(schema)
+                table = table.cast(self._schema)
+            self._stream.write_table(table, max_chunksize=self.batch_rows or max(len(table), 1))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as error:
+            raise ValueError(f"Bloc incompatible avec l'entrée {self.name} : {error}") from error
+        self.rows += len(df)
+
+    def close(self):
+        """Met en place l'entrée et ses métadonnées (rien si aucun bloc n'a été écrit)"""
+        if self._stream is None:
+            self.abort()
+            return
+        self._stream.close()
+        self._stream = None
+
+        # Types définitifs : types élargis, catégories de tous les blocs
+        empty = self._empty.copy()
+        plain = self._schema.empty_table().to_pandas()
+        for column in empty.columns:
+            if column in self._categories:
+                empty[column] = empty[column].cat.set_categories(sorted(self._categories[column]))
+            elif empty[column].dtype != plain[column].dtype:
+                empty[column] = empty[column].astype(plain[column].dtype)
+        schema = pa.Schema.from_pandas(empty, preserve_index=False)
+
+        def write(tmp_path):
+            # Écriture non compressée pour permettre le mappage mémoire
+            with pa.ipc.new_file(tmp_path, schema) as writer:
+                for segment in self._segments:
+                    with pa.ipc.open_stream(segment) as reader:
+                        for batch in reader:
+                            frame = batch.cast(self._schema).to_pandas()
+                            for column in self._categories:
+                                frame[column] = pd.Categorical(frame[column],
+                                                               dtype=empty[column].dtype)
+                            writer.write_table(pa.Table.from_pandas(frame, schema=schema,
+                                                                    preserve_index=False))
+            return self.cache._batch_stats(tmp_path, self._has_index)
+
+        try:
+            data_path, _ = self.cache._paths(self.name)
+            batches = self.cache._replace(self.name, data_path, write)
+        finally:
+            self.abort()
+        self.cache._write_entry_meta(self.name, self.source_path, self._has_index,
+                                     self._index_name, batches)
+
+    def abort(self):
+        """Abandonne l'écriture ; l'entrée existante éventuelle est conservée"""
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        for segment in self._segments:
+            if os.path.exists(segment):
+                os.remove(segment)
+        self._segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
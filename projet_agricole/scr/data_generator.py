@@ -0,0 +1,368 @@
+# data_generator.py
+# Générateur de données synthétiques reproductibles aux schémas des fichiers
+# de data/ (météo horaire, sols, monitoring journalier, historique mensuel
+# des rendements), écrits par blocs pour produire des jeux de plusieurs Go.
+#
+# Exemple : python data_generator.py /tmp/agri --parcels 5000 --years 10
+# --format feather remplit en plus, bloc par bloc, le cache colonnaire du
+# gestionnaire de données (data_root/.cache), lu dès le premier chargement.
+
+import argparse
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow absent : CSV écrit par pandas, sans cache colonnaire
+    pa = None
+
+
+# Cultures : (durée de croissance en mois, rendement potentiel en t/ha)
+CROPS = {'Ble': (8, 6.5), 'Mais': (6, 9.0), 'Tournesol': (5, 3.5)}
+SOIL_TYPES = ['argileux', 'argilo-limoneux', 'sablo-limoneux']
+# Centre et dispersion (degrés) de la zone des parcelles de data/
+CENTER = (33.87, -5.54)
+SPREAD = 0.035
+
+FILENAMES = {
+    'weather_data': 'meteo_detaillee',
+    'soil_data': 'sols',
+    'monitoring_data': 'monitoring_cultures',
+    'yield_history': 'historique_rendements',
+    'weather_stations': 'stations_meteo',
+}
+# csv : fichiers sources seuls ; feather : sources et cache colonnaire
+FORMATS = ('csv', 'feather')
+
+
+def parcel_ids(n_parcels):
+    """Identifiants P001, P002... (largeur fixe, l'ordre alphabétique suit l'ordre numérique)"""
+    width = max(3, len(str(n_parcels)))
+    return np.array([f'P{i:0{width}d}' for i in range(1, n_parcels + 1)], dtype=object)
+
+
+class SmoothNoise:
+    def __init__(self, rng, n_series, window):
+        """
+        Bruit lissé (moyenne mobile d'un bruit blanc, variance unitaire) de
+        plusieurs séries, continu d'un bloc à l'autre
+        """
+        self.rng = rng
+        self.window = window
+        self.tail = rng.standard_normal((n_series, window - 1))
+
+    def next(self, length):
+        """Retourne les length valeurs suivantes de chaque série"""
+        white = np.concatenate([self.tail, self.rng.standard_normal((len(self.tail), length))], axis=1)
+        self.tail = white[:, length:]
+        cumulative = np.concatenate([np.zeros((len(white), 1)), np.cumsum(white, axis=1)], axis=1)
+        return (cumulative[:, self.window:] - cumulative[:, :-self.window]) / np.sqrt(self.window)
+
+
+def generate_soil(rng, ids):
+    """Caractéristiques de sol et coordonnées de chaque parcelle"""
+    n = len(ids)
+    spread = SPREAD * max(1.0, np.sqrt(n / 50))
+    return pd.DataFrame({
+        'parcelle_id': ids,
+        'latitude': np.round(CENTER[0] + rng.normal(0, spread, n), 6),
+        'longitude': np.round(CENTER[1] + rng.normal(0, spread, n), 6),
+        'type_sol': rng.choice(SOIL_TYPES, n),
+        'surface_ha': np.round(rng.uniform(5, 20, n), 2),
+        'capacite_retention_eau': np.round(rng.uniform(0.4, 0.9, n), 2),
+        'ph': np.round(np.clip(rng.normal(7.1, 0.55, n), 5.5, 8.5), 1),
+        'matiere_organique': np.round(np.clip(rng.normal(3.2, 0.65, n), 1, 5), 2),
+        'azote': np.round(np.clip(rng.normal(0.2, 0.04, n), 0.08, 0.35), 3),
+        'phosphore': np.round(np.clip(rng.normal(40, 10.5, n), 15, 70), 1),
+        'potassium': np.round(np.clip(rng.normal(252, 51, n), 120, 400), 1),
+    })
+
+
+def generate_stations(rng, soil, n_stations):
+    """Stations météo réparties sur l'emprise des parcelles"""
+    width = max(3, len(str(n_stations)))
+    return pd.DataFrame({
+        'station_id': [f'S{i:0{width}d}' for i in range(1, n_stations + 1)],
+        'latitude': np.round(rng.uniform(soil['latitude'].min(), soil['latitude'].max(), n_stations), 6),
+        'longitude': np.round(rng.uniform(soil['longitude'].min(), soil['longitude'].max(), n_stations), 6),
+    })
+
+
+def generate_weather(rng, hours, noise, offsets):
+    """
+    Bloc de météo horaire de chaque station (cycles annuel et journalier,
+    épisodes de pluie, rayonnement diurne), lignes triées par date
+    """
+    n_stations, n_hours = len(offsets), len(hours)
+    day = (hours.dayofyear.to_numpy() - 1)[None, :]
+    hour = hours.hour.to_numpy()[None, :]
+    annual = np.sin(2 * np.pi * (day - 110) / 365)
+    diurnal = np.cos(2 * np.pi * (hour - 15) / 24)
+
+    temperature = 15 + 8 * annual + 5 * diurnal + offsets[:, None] + 2 * noise.next(n_hours)
+    rain = rng.random((n_stations, n_hours)) < 0.06 + 0.04 * (annual < 0)
+    precipitation = np.where(rain, rng.exponential(3.0, (n_stations, n_hours)), 0.0)
+    humidite = np.clip(88 - 1.2 * (temperature - 15) + 4 * rng.standard_normal((n_stations, n_hours))
+                       + 5 * rain, 30, 95)
+    # Hauteur du soleil approchée : nulle la nuit, plus forte en été
+    sun = np.clip(np.cos(2 * np.pi * (hour - 13) / 24) - 0.25 * (1 - annual) / 2 - 0.1, 0, None)
+    cloud = np.where(rain, 0.3, rng.uniform(0.7, 1.0, (n_stations, n_hours)))
+    rayonnement = 1150 * sun * cloud
+
+    weather = pd.DataFrame({
+        'date': np.tile(hours.to_numpy(), n_stations),
+        'temperature': np.round(temperature, 2).ravel(),
+        'humidite': np.round(humidite, 1).ravel(),
+        'precipitation': np.round(precipitation, 2).ravel(),
+        'rayonnement_solaire': np.round(rayonnement, 2).ravel(),
+        'vitesse_vent': np.round(rng.gamma(6.5, 0.77, n_stations * n_hours), 1),
+        'direction_vent': np.round(rng.uniform(0, 360, n_stations * n_hours), 1),
+    })
+    if n_stations > 1:
+        weather.insert(1, 'station_id', np.repeat(np.arange(n_stations), n_hours))
+        weather = weather.sort_values(['date', 'station_id'], kind='stable')
+    return weather
+
+
+def generate_monitoring(rng, ids, days):
+    """
+    Bloc de monitoring journalier d'un groupe de parcelles (NDVI saisonnier
+    propre à chaque parcelle, LAI et biomasse dérivés, stress hydrique)
+    """
+    n_parcels, n_days = len(ids), len(days)
+    day = (days.dayofyear.to_numpy() - 1)[None, :]
+    phase = rng.uniform(-0.6, 0.6, (n_parcels, 1))
+    amplitude = rng.uniform(0.15, 0.3, (n_parcels, 1))
+    noise = SmoothNoise(rng, n_parcels, 10).next(n_days)
+
+    ndvi = np.clip(0.5 + amplitude * np.sin(2 * np.pi * (day - 60) / 365 + phase)
+                   + 0.05 * noise + 0.02 * rng.standard_normal((n_parcels, n_days)), 0.02, 0.95)
+    stress = np.clip(rng.gamma(2.5, 0.035, (n_parcels, n_days)) + 0.1 * (0.5 - ndvi), 0, 1)
+
+    # Lignes triées par date puis par parcelle, comme dans data/
+    return pd.DataFrame({
+        'date': np.repeat(days.to_numpy(), n_parcels),
+        'parcelle_id': np.tile(ids, n_days),
+        'ndvi': np.round(ndvi, 3).T.ravel(),
+        'lai': np.round(5 * ndvi, 2).T.ravel(),
+        'biomasse_estimee': np.round(1000 * ndvi, 1).T.ravel(),
+        'stress_hydrique': np.round(stress, 3).T.ravel(),
+    })
+
+
+def generate_yields(rng, ids, months):
+    """
+    Bloc d'historique mensuel des rendements : cycles de culture successifs
+    (progression jusqu'à 100 % puis rendement final conservé quelques mois,
+    ou cycle interrompu), rendement estimé croissant avec la progression
+    """
+    n_parcels, n_months = len(ids), len(months)
+    crops = np.array(list(CROPS))
+    growth_by_crop = np.array([CROPS[c][0] for c in crops])
+    potential_by_crop = np.array([CROPS[c][1] for c in crops])
+
+    # Au plus un cycle par mois : n_months cycles couvrent toujours la période
+    crop = rng.integers(0, len(crops), (n_parcels, n_months))
+    growth = growth_by_crop[crop]
+    interrupted = rng.random((n_parcels, n_months)) < 0.3
+    length = np.where(interrupted, rng.integers(1, growth), growth + 1 + rng.integers(0, 7, crop.shape))
+    ends = np.cumsum(length, axis=1)
+    potential = potential_by_crop[crop] * rng.lognormal(0, 0.15, crop.shape)
+
+    # Cycle en cours à chaque mois (recherche groupée par parcelle)
+    stride = int(ends.max()) + 1
+    flat_ends = (ends + np.arange(n_parcels)[:, None] * stride).ravel()
+    month = np.arange(n_months)[None, :] + np.arange(n_parcels)[:, None] * stride
+    cycle = np.searchsorted(flat_ends, month.ravel(), side='right').reshape(n_parcels, n_months) \
+        - np.arange(n_parcels)[:, None] * n_months
+    rows = np.arange(n_parcels)[:, None]
+    step = np.arange(n_months)[None, :] - (ends[rows, cycle] - length[rows, cycle])
+
+    progression = np.minimum(100 * step / growth[rows, cycle], 100)
+    final = potential[rows, cycle]
+    estimate = np.maximum(final * progression / 100 * (1 + 0.08 * rng.standard_normal(crop.shape)), 0)
+
+    return pd.DataFrame({
+        'parcelle_id': np.repeat(ids, n_months),
+        'date': np.tile(months.strftime('%Y-%m-%d').to_numpy(), n_parcels),
+        'culture': crops[crop[rows, cycle]].ravel(),
+        'rendement_estime': np.round(estimate, 2).ravel(),
+        'rendement_final': np.where(progression >= 100, final, np.nan).ravel(),
+        'progression': np.round(progression, 1).ravel(),
+    })
+
+
+class ChunkWriter:
+    def __init__(self, path, date_format='%Y-%m-%d', cache=None):
+        """
+        Écrit un tableau CSV bloc par bloc. Les dates sont écrites au
+        format date_format.
+
+        cache : écriture de l'entrée du cache colonnaire du jeu de données
+        (AgriculturalDataManager.cache_writer), qui reçoit chaque bloc CSV
+        écrit ; elle est fermée après le fichier
+        """
+        if cache is not None and pa is None:
+            raise ValueError("Le cache colonnaire nécessite pyarrow.")
+        self.path = path
+        self.date_format = date_format
+        self.cache = cache
+        self.rows = 0
+        self._file = None
+        self._schema = None
+        self._header = None
+
+    def write(self, frame):
+        """Ajoute un bloc au fichier"""
+        if pa is None:
+            frame.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0,
+                         index=False, date_format=self.date_format)
+            self.rows += len(frame)
+            return
+
+        # Écriture CSV d'Arrow, bien plus rapide que DataFrame.to_csv
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        for i, field in enumerate(table.schema):
+            if pa.types.is_timestamp(field.type):
+                dates = table.column(i).cast(pa.timestamp('s'))
+                table = table.set_column(i, field.name, pc.strftime(dates, format=self.date_format))
+        if self._schema is None:
+            self._schema = table.schema
+            # En-tête écrit sans guillemets, comme les fichiers de data/
+            self._header = (','.join(self._schema.names) + '\n').encode()
+            self._file = open(self.path, 'wb')
+            self._file.write(self._header)
+        sink = pa.BufferOutputStream()
+        pa_csv.write_csv(table.cast(self._schema), sink,
+                         write_options=pa_csv.WriteOptions(include_header=False, quoting_style='none'))
+        block = sink.getvalue()
+        self._file.write(block)
+        if self.cache is not None:
+            # Le bloc est relu tel qu'il est écrit dans le CSV
+            self.cache.write_csv(io.BytesIO(self._header + block.to_pybytes()))
+        self.rows += len(frame)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None and self.cache is not None:
+            self.cache.abort()
+            self.cache = None
+        self.close()
+
+
+def generate_dataset(output_dir, n_parcels=50, years=5, start_year=2020, seed=0,
+                     fmt='csv', chunk_rows=1_000_000, n_stations=1):
+    """
+    Génère les quatre jeux de données (et les stations météo si
+    n_stations > 1) dans output_dir, bloc par bloc d'au plus chunk_rows
+    lignes. La même graine et la même taille de bloc donnent les mêmes
+    fichiers. Retourne le nombre de lignes écrites par jeu de données.
+
+    fmt='feather' alimente aussi le cache colonnaire du gestionnaire de
+    données (output_dir/.cache) au fil des blocs, sans relire les CSV : le
+    premier chargement lit alors directement les fichiers Feather.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Format inconnu : {fmt} (formats possibles : {', '.join(FORMATS)})")
+    if fmt == 'feather' and pa is None:
+        raise ValueError("Le format feather nécessite pyarrow.")
+    os.makedirs(output_dir, exist_ok=True)
+
+    manager = None
+    if fmt == 'feather':
+        # Import différé : la génération CSV ne dépend pas du gestionnaire
+        from data_manager import AgriculturalDataManager
+        manager = AgriculturalDataManager(data_root=output_dir)
+
+    def path(name):
+        return os.path.join(output_dir, f'{FILENAMES[name]}.csv')
+
+    def open_writer(name, **options):
+        cache = None if manager is None else manager.cache_writer(name)
+        return ChunkWriter(path(name), cache=cache, **options)
+
+    # Un flux aléatoire indépendant par jeu de données
+    streams = np.random.SeedSequence(seed).spawn(4)
+    ids = parcel_ids(n_parcels)
+    first, last = pd.Timestamp(start_year, 1, 1), pd.Timestamp(start_year + years - 1, 12, 31)
+    counts = {}
+
+    soil_rng = np.random.default_rng(streams[0])
+    soil = generate_soil(soil_rng, ids)
+    with open_writer('soil_data') as writer:
+        writer.write(soil)
+    counts['soil_data'] = len(soil)
+
+    weather_rng = np.random.default_rng(streams[1])
+    stations = None
+    if n_stations > 1:
+        stations = generate_stations(weather_rng, soil, n_stations)
+        with open_writer('weather_stations') as writer:
+            writer.write(stations)
+        counts['weather_stations'] = n_stations
+    hours = pd.date_range(first, last + pd.Timedelta(hours=23), freq='h')
+    noise = SmoothNoise(weather_rng, n_stations, 24)
+    offsets = weather_rng.normal(0, 1, n_stations)
+    block = max(1, chunk_rows // n_stations)
+    with open_writer('weather_data', date_format='%Y-%m-%d %H:%M:%S') as writer:
+        for start in range(0, len(hours), block):
+            weather = generate_weather(weather_rng, hours[start:start + block], noise, offsets)
+            if stations is not None:
+                weather['station_id'] = stations['station_id'].to_numpy()[weather['station_id']]
+            writer.write(weather)
+        counts['weather_data'] = writer.rows
+
+    def write_by_parcel(name, rng, generator, periods):
+        group = max(1, chunk_rows // len(periods))
+        with open_writer(name) as writer:
+            for start in range(0, len(ids), group):
+                writer.write(generator(rng, ids[start:start + group], periods))
+            counts[name] = writer.rows
+
+    write_by_parcel('monitoring_data', np.random.default_rng(streams[2]), generate_monitoring,
+                    pd.date_range(first, last, freq='D'))
+    write_by_parcel('yield_history', np.random.default_rng(streams[3]), generate_yields,
+                    pd.date_range(first, last, freq='ME'))
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère des données agricoles synthétiques.")
+    parser.add_argument('output_dir', help="répertoire de sortie")
+    parser.add_argument('--parcels', type=int, default=50, help="nombre de parcelles")
+    parser.add_argument('--years', type=int, default=5, help="nombre d'années")
+    parser.add_argument('--start-year', type=int, default=2020, help="première année")
+    parser.add_argument('--stations', type=int, default=1, help="nombre de stations météo")
+    parser.add_argument('--seed', type=int, default=0, help="graine aléatoire")
+    parser.add_argument('--format', choices=FORMATS, default='csv',
+                        help="csv, ou feather : CSV et cache colonnaire pré-rempli")
+    parser.add_argument('--chunk-rows', type=int, default=1_000_000,
+                        help="nombre maximal de lignes générées par bloc")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    counts = generate_dataset(args.output_dir, args.parcels, args.years, args.start_year,
+                              args.seed, args.format, args.chunk_rows, args.stations)
+    for name, rows in counts.items():
+        print(f"{name:18s}: {rows} lignes")
+    print(f"Données générées dans {args.output_dir} en {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
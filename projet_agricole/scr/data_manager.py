@@ -1,68 +1,806 @@
-
+import os
+import threading
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from sklearn.preprocessing import StandardScaler
 import warnings
 from statsmodels.tsa.seasonal import seasonal_decompose
+from data_cache import BATCH_ROWS, ColumnarCache
+from weather_stream import WeatherStream
+from feature_pipeline import FeaturePipeline
+from parcel_index import ParcelIndex, ParcelStatistics
+from decomposition import decompose_frame
+from trends import TemporalTrends
+from risk import RiskScorer
+from agro_features import derive_weather_features
+from instrumentation import INSTRUMENTATION, instrumented
+from weather_rollups import (DEFAULT_MIN_POINTS, RESOLUTIONS, build_rollup, period_start,
+                             select_resolution)
 
 warnings.filterwarnings('ignore')
 
+# Répertoire des données par défaut (indépendant du répertoire courant)
+DEFAULT_DATA_ROOT = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data'))
+
+# Registre des jeux de données : fichier source (relatif à la racine des
+# données), colonne de dates servant d'index temporel et indexation par
+# parcelle (tri par parcelle_id au chargement)
+DATASETS = {
+    'monitoring_data': {'filename': 'monitoring_cultures.csv', 'date_column': 'date',
+                        'parcel_index': True},
+    'weather_data': {'filename': 'meteo_detaillee.csv', 'date_column': 'date'},
+    'soil_data': {'filename': 'sols.csv', 'date_column': None},
+    'yield_history': {'filename': 'historique_rendements.csv', 'date_column': 'date',
+                      'parcel_index': True},
+    # Coordonnées des stations météo, utilisées lorsque la météo couvre
+    # plusieurs stations (colonne station_id) ; fichier facultatif
+    'weather_stations': {'filename': 'stations_meteo.csv', 'date_column': None,
+                         'optional': True},
+}
+
+# Mode compact : colonnes d'identifiants et de types stockées en catégories,
+# mesures en float32. Les coordonnées gardent leur précision, ainsi que les
+# mesures comparées à des seuils (stress.py) : en float32, 0.05 devient
+# 0.0500000007 et changerait d'intervalle
+CATEGORICAL_COLUMNS = ('parcelle_id', 'culture', 'type_sol', 'station_id')
+FLOAT64_COLUMNS = ('latitude', 'longitude', 'stress_hydrique', 'temperature')
+
+# Taille des blocs de lecture des CSV filtrés au chargement
+CSV_CHUNK_ROWS = 100_000
+# Colonnes toujours conservées lors d'une sélection de colonnes
+KEY_COLUMNS = ('parcelle_id', 'date')
+# Jeux de données dont dépend le pipeline de caractéristiques ajusté
+PIPELINE_DATASETS = ('weather_data', 'soil_data', 'weather_stations', 'monitoring_data')
+
+# Gestionnaires partagés du processus, par répertoire de données et options
+_shared_managers = {}
+_shared_managers_lock = threading.Lock()
+
+
+def _dataset_property(name, doc):
+    """
+    Crée une propriété qui charge le jeu de données au premier accès
+    """
+    def getter(self):
+        return self.get_dataset(name)
+
+    def setter(self, value):
+        # Affecter None décharge le jeu de données (rechargé au prochain accès)
+        self._set_frame(name, value)
+
+    return property(getter, setter, doc=doc)
+
+
 class AgriculturalDataManager:
-    def __init__(self):
-        """Initialise le gestionnaire de données agricoles"""
-        self.monitoring_data = None  # Données de surveillance des cultures
-        self.weather_data = None     # Données météorologiques
-        self.soil_data = None        # Données sur le sol
-        self.yield_history = None    # Historique des rendements
+    monitoring_data = _dataset_property('monitoring_data', "Données de surveillance des cultures")
+    weather_data = _dataset_property('weather_data', "Données météorologiques")
+    soil_data = _dataset_property('soil_data', "Données sur le sol")
+    yield_history = _dataset_property('yield_history', "Historique des rendements")
+    weather_stations = _dataset_property('weather_stations', "Coordonnées des stations météo")
+
+    def __init__(self, data_root=None, datasets=None, cache_dir=None, use_cache=True,
+                 compact=False, station_neighbors=1, shared=False):
+        """
+        Initialise le gestionnaire de données agricoles
+
+        data_root : répertoire des CSV (par défaut le dossier data du projet)
+        datasets : surcharges du registre DATASETS, par nom de jeu de données
+                   (nom de fichier, chemin ou dictionnaire de paramètres)
+
+        Chaque jeu de données est chargé au premier accès à l'attribut
+        correspondant. Les jeux normalisés sont conservés dans un cache
+        colonnaire (cache_dir, par défaut data_root/.cache) invalidé à
+        chaque modification des CSV sources ; use_cache=False force la
+        relecture des CSV.
+
+        compact=True réduit l'empreinte mémoire des jeux chargés : catégories
+        pour parcelle_id, culture et type_sol, float32 pour les mesures et
+        pas de colonne 'date' dupliquant l'index (voir memory_report()).
+
+        station_neighbors : nombre de stations météo les plus proches
+        mélangées (pondération par l'inverse de la distance) pour chaque
+        parcelle, lorsque plusieurs stations sont disponibles.
+
+        shared=True lit les jeux complets (sans filtre de chargement) sans
+        copie depuis le cache colonnaire mappé en mémoire : les tableaux sont
+        en lecture seule et leurs pages sont partagées par tous les processus
+        de la machine (voir shared_data_manager()).
+        """
+        self.data_root = os.path.abspath(data_root or DEFAULT_DATA_ROOT)
+        self.compact = compact
+        self.shared = shared
+        self.station_neighbors = station_neighbors
+        self.datasets = {name: dict(spec) for name, spec in DATASETS.items()}
+        for name, spec in (datasets or {}).items():
+            if isinstance(spec, str):
+                spec = {'filename': spec}
+            self.datasets.setdefault(name, {'date_column': 'date'}).update(spec)
+
+        self._frames = {}  # Jeux de données déjà chargés
+        self._filters = {}  # Filtres de chargement fixés par load_data()
+        self._parcel_indexes = {}  # Index par parcelle, par jeu de données
+        self._versions = {}  # Version de chaque jeu de données, incrémentée à chaque modification
+        self._source_versions = {}  # Version de chaque jeu tel que lu depuis sa source
         self.scaler = StandardScaler() # Pour normaliser les données
+        self.feature_pipeline = None   # Pipeline ajusté par fit_feature_pipeline()
+        self._feature_pipeline_key = None  # Versions des jeux lors de l'ajustement
+        self._custom_pipeline = None  # (météo externe, versions des jeux, pipeline)
+        self._feature_matrix = None  # (versions des jeux du pipeline, caractéristiques)
+        self._parcel_stats = {}      # (version, agrégats par parcelle), par jeu de données
+        self._temporal_trends = None # ((version, colonne), tendances par parcelle)
+        self._risk_scorer = None     # (version de yield_history, moteur de score)
+        self._derived_weather = None # (versions météo/sol/stations, grandeurs agronomiques)
+        self._weather_rollups = None # (version météo, agrégats par résolution)
+        self._append_listeners = []
+        # Protège le remplissage des caches paresseux (jeux chargés, index,
+        # artefacts dérivés), aussi appelés depuis les threads des tableaux de bord
+        self._cache_lock = threading.RLock()
+        if cache_dir is None:
+            cache_dir = os.path.join(self.data_root, '.cache')
+        self.cache = ColumnarCache(cache_dir) if use_cache else None
+
+    def dataset_path(self, name):
+        """Retourne le chemin du fichier source d'un jeu de données"""
+        if name not in self.datasets:
+            raise ValueError(f"Jeu de données inconnu : {name}")
+        return os.path.join(self.data_root, self.datasets[name]['filename'])
 
-    def load_data(self):
+    def has_dataset(self, name):
+        """
+        Indique si un jeu de données est disponible : enregistré, et dont
+        le fichier existe s'il est facultatif
+        """
+        if name not in self.datasets:
+            return False
+        return not self.datasets[name].get('optional') or os.path.exists(self.dataset_path(name))
+
+    def is_loaded(self, name):
+        """Indique si un jeu de données est déjà chargé en mémoire"""
+        return name in self._frames
+
+    def get_dataset(self, name):
+        """Retourne un jeu de données du registre, chargé à la demande"""
+        with self._cache_lock:
+            if name not in self._frames:
+                self._set_frame(name, self._load_dataset(name))
+                self._source_versions[name] = self.dataset_version(name)
+            return self._frames[name]
+
+    def _set_frame(self, name, frame):
+        """Remplace un jeu de données en mémoire et incrémente sa version"""
+        with self._cache_lock:
+            if frame is None:
+                self._frames.pop(name, None)
+            else:
+                self._frames[name] = frame
+            self._versions[name] = self._versions.get(name, 0) + 1
+
+    def dataset_version(self, name):
+        """Version d'un jeu de données, modifiée à chaque remplacement"""
+        return self._versions.get(name, 0)
+
+    @property
+    def data_version(self):
+        """Version de l'ensemble des jeux de données, utilisable comme clé de cache"""
+        return tuple(self.dataset_version(name) for name in self.datasets)
+
+    def memory_report(self):
+        """
+        Retourne l'occupation mémoire des jeux de données chargés
+        (lignes, colonnes, octets index compris) et leur total
+        """
+        report = pd.DataFrame(
+            [(len(frame), frame.shape[1], int(frame.memory_usage(index=True, deep=True).sum()))
+             for frame in self._frames.values()],
+            index=pd.Index(list(self._frames), name='dataset'),
+            columns=['lignes', 'colonnes', 'octets'])
+        report.loc['total'] = report.sum()
+        report['mo'] = report['octets'] / 2 ** 20
+        return report
+
+    @instrumented()
+    def merge_features(self, data):
+        """
+        Fusionne un lot de monitoring avec la météo et le sol, sans
+        normalisation (valeurs dans leurs unités d'origine)
+        """
+        with self._cache_lock:
+            pipeline = self.feature_pipeline if self._pipeline_is_current() \
+                else self._new_feature_pipeline(self.weather_data)
+        return pipeline.merge(data)
+
+    def _pipeline_key(self):
+        """Versions des jeux de données dont dépend le pipeline de caractéristiques"""
+        names = [name for name in PIPELINE_DATASETS if self.has_dataset(name)]
+        for name in names:
+            self.get_dataset(name)
+        return tuple(self.dataset_version(name) for name in names)
+
+    def _pipeline_is_current(self):
+        """Indique si le pipeline ajusté correspond encore aux jeux de données chargés"""
+        return self.feature_pipeline is not None \
+            and self._feature_pipeline_key == self._pipeline_key()
+
+    def _new_feature_pipeline(self, weather):
+        """
+        Crée un pipeline de caractéristiques pour une série météo ; la
+        jointure est spatiale (station la plus proche de chaque parcelle)
+        si la météo couvre plusieurs stations
+        """
+        stations = None
+        if 'station_id' in weather.columns:
+            if not self.has_dataset('weather_stations'):
+                raise ValueError("La météo comporte une colonne 'station_id' mais les "
+                                 "coordonnées des stations sont absentes.")
+            stations = self.weather_stations
+        derived = self.derived_weather_features() if weather is self.weather_data \
+            else derive_weather_features(weather, self._weather_latitude(weather))
+        return FeaturePipeline(weather, self.soil_data, stations=stations,
+                               neighbors=self.station_neighbors, derived=derived)
+
+    @instrumented()
+    def derived_weather_features(self):
+        """
+        Grandeurs agronomiques journalières de toute la série météo
+        (degrés-jours de croissance et leur cumul annuel, cumuls glissants
+        de précipitation sur 7 et 30 jours, ET0 Penman-Monteith), par
+        station le cas échéant. Calculées une fois par version des données.
+        """
+        with self._cache_lock:
+            key = tuple(self.dataset_version(name)
+                        for name in ('weather_data', 'soil_data', 'weather_stations'))
+            if self._derived_weather is None or self._derived_weather[0] != key:
+                features = derive_weather_features(self.weather_data,
+                                                   self._weather_latitude(self.weather_data))
+                self._derived_weather = (key, features)
+            return self._derived_weather[1]
+
+    def _weather_latitude(self, weather):
+        """
+        Latitude utilisée pour le rayonnement extraterrestre : celle de
+        chaque station, ou la latitude moyenne des parcelles
+        """
+        if 'station_id' in weather.columns and self.has_dataset('weather_stations'):
+            stations = self.weather_stations
+            return pd.Series(stations['latitude'].to_numpy(dtype=float),
+                             index=stations['station_id'].astype(object))
+        if 'latitude' not in self.soil_data.columns:
+            return np.nan
+        return float(self.soil_data['latitude'].mean())
+
+    @instrumented(rows=None)
+    def load_data(self, start=None, end=None, parcels=None, columns=None):
         """
         Charge l'ensemble des données nécessaires au système
         Effectue les conversions de types et les indexations temporelles
+
+        Les filtres optionnels sont appliqués dès la lecture, de sorte que
+        seule la partie demandée est chargée en mémoire :
+        start, end : bornes (incluses) des dates des jeux indexés par date ;
+                     une date de fin sans heure couvre toute la journée
+        parcels : identifiant ou liste d'identifiants de parcelles
+        columns : liste de colonnes, ou dictionnaire {jeu de données: colonnes} ;
+                  parcelle_id, l'index de dates et la colonne 'date' sont
+                  toujours conservés
+
+        Les jeux déjà chargés avec d'autres filtres sont rechargés ; les
+        accès ultérieurs aux jeux non chargés utilisent les mêmes filtres.
         """
-        # Chargement des données de monitoring
-        self.monitoring_data = pd.read_csv(r'../../data/monitoring_cultures.csv', 
-                                         parse_dates=['date'])
-        self.monitoring_data.set_index('date', inplace=True)
-        
-        # Chargement des données météo
-        self.weather_data = pd.read_csv(r'../../data/meteo_detaillee.csv', 
-                                      parse_dates=['date'])
-        self.weather_data.set_index('date', inplace=True)
-        
-        # Chargement des données du sol
-        self.soil_data = pd.read_csv(r'../../data/sols.csv')
-        
-        # Chargement de l'historique des rendements
-        self.yield_history = pd.read_csv(r'../../data/historique_rendements.csv', 
-                                       parse_dates=['date'])
-        self.yield_history.set_index('date', inplace=True)
-        # Convertir les dates en datetime
-        self.monitoring_data['date'] = pd.to_datetime(self.monitoring_data.index, errors='coerce')
+        if isinstance(parcels, str) or (parcels is not None and not pd.api.types.is_list_like(parcels)):
+            parcels = [parcels]
+        filters = {
+            'start': None if start is None else pd.Timestamp(start),
+            'end': None if end is None else self._end_bound(end),
+            'parcels': None if parcels is None else list(parcels),
+            'columns': columns,
+        }
+        if filters['start'] is not None and filters['end'] is not None \
+                and filters['start'] > filters['end']:
+            raise ValueError("La date de début doit précéder la date de fin.")
+        self._check_columns(columns)
+
+        filters = {key: value for key, value in filters.items() if value is not None}
+        if filters != self._filters:
+            for name in list(self._frames):
+                self._set_frame(name, None)
+            self._filters = filters
+
+        for name in self.datasets:
+            if self.has_dataset(name):
+                self.get_dataset(name)
         print("Données de monitoring chargées et colonne 'date' convertie.")
-        self.weather_data['date'] = pd.to_datetime(self.weather_data.index, errors='coerce')
-        self.yield_history['date'] = pd.to_datetime(self.yield_history.index.astype(str), format='%Y', errors='coerce')
 
-        # Vérifier les valeurs manquantes
-        for dataset_name, dataset in [('monitoring_data', self.monitoring_data), 
-                                      ('weather_data', self.weather_data)]:
+    @staticmethod
+    def _end_bound(end):
+        """
+        Borne de fin incluse : une date sans heure ('2021-06-30',
+        datetime.date) désigne la dernière heure de ce jour, un horodatage
+        est conservé tel quel
+        """
+        timestamp = pd.Timestamp(end)
+        date_only = (isinstance(end, date) and not isinstance(end, datetime)) \
+            or (isinstance(end, str) and ':' not in end and timestamp == timestamp.normalize())
+        if date_only:
+            return timestamp + pd.Timedelta(days=1) - pd.Timedelta(1, unit='ns')
+        return timestamp
+
+    def _load_dataset(self, name):
+        """
+        Charge un jeu de données normalisé depuis le cache colonnaire,
+        ou depuis le CSV source (puis alimente le cache) si le cache est
+        absent ou périmé
+        """
+        with INSTRUMENTATION.stage(f'AgriculturalDataManager._load_dataset.{name}') as stage:
+            path = self.dataset_path(name)
+            filters = self._dataset_filters(name)
+            # Les jeux compacts ou partagés ont leurs propres entrées dans le cache
+            shared = self.shared and not filters
+            key = self._cache_key(name, shared)
+            dataset = None
+            if self.cache is not None and self.cache.available:
+                # Le cache ne lit que les colonnes et les lots concernés par les
+                # filtres ; un jeu partagé est lu sans copie, en un seul lot
+                options = {'zero_copy': True} if shared else self._cache_filters(filters)
+                with INSTRUMENTATION.stage('ColumnarCache.load'):
+                    dataset = self.cache.load(key, path, **options)
+                if dataset is None:
+                    # Le cache est alimenté avec le jeu complet, filtré ensuite
+                    dataset = self._normalize_dataset(name, self._read_source(name, path))
+                    with INSTRUMENTATION.stage('ColumnarCache.store'):
+                        self.cache.store(key, path, dataset,
+                                         batch_rows=None if shared else BATCH_ROWS)
+                    if shared:
+                        # La copie lue depuis le CSV est remplacée par la vue mappée
+                        dataset = self.cache.load(key, path, zero_copy=True)
+            if dataset is None:
+                dataset = self._normalize_dataset(name, self._read_source(name, path, **filters))
+            dataset = self._filter_rows(dataset, **filters)
+
+            self._check_dataset(name, dataset)
+            stage.rows = len(dataset)
+        return dataset
+
+    def _cache_key(self, name, shared=False):
+        """Nom de l'entrée du cache d'un jeu de données (variantes compacte et partagée)"""
+        key = f'{name}.compact' if self.compact else name
+        return f'{key}.shared' if shared else key
+
+    def cache_writer(self, name):
+        """
+        Écriture bloc par bloc de l'entrée du cache d'un jeu de données dont
+        le CSV source est produit par morceaux (data_generator.py), sans
+        relire le fichier complet. Voir DatasetCacheWriter.
+        """
+        if self.cache is None or not self.cache.available:
+            raise ValueError("Le cache colonnaire est indisponible (désactivé ou pyarrow absent).")
+        if name not in self.datasets:
+            raise ValueError(f"Jeu de données inconnu : {name}")
+        return DatasetCacheWriter(self, name)
+
+    def _dataset_filters(self, name):
+        """Filtres de chargement applicables à un jeu de données"""
+        filters = dict(self._filters)
+        if self.datasets[name].get('date_column') is None:
+            filters.pop('start', None)
+            filters.pop('end', None)
+        columns = filters.pop('columns', None)
+        if isinstance(columns, dict):
+            columns = columns.get(name)
+        if columns is not None:
+            filters['columns'] = list(columns)
+        return filters
+
+    def _source_columns(self, name):
+        """Colonnes du CSV source d'un jeu de données (lecture de l'en-tête)"""
+        return list(pd.read_csv(self.dataset_path(name), nrows=0).columns)
+
+    def _check_columns(self, columns):
+        """Vérifie que les colonnes demandées existent dans les sources"""
+        if columns is None:
+            return
+        if isinstance(columns, dict):
+            for name, selected in columns.items():
+                unknown = set(selected) - set(self._source_columns(name)) - set(KEY_COLUMNS)
+                if unknown:
+                    raise ValueError(f"Colonnes inconnues dans {name} : {', '.join(sorted(unknown))}")
+        else:
+            available = set(KEY_COLUMNS)
+            for name in self.datasets:
+                if self.has_dataset(name):
+                    available.update(self._source_columns(name))
+            unknown = set(columns) - available
+            if unknown:
+                raise ValueError(f"Colonnes inconnues : {', '.join(sorted(unknown))}")
+
+    @staticmethod
+    def _cache_filters(filters):
+        """Filtres de lecture du cache (colonnes clés comprises)"""
+        cache_filters = dict(filters)
+        if 'columns' in cache_filters:
+            cache_filters['columns'] = list(cache_filters['columns']) + list(KEY_COLUMNS)
+        return cache_filters
+
+    @instrumented()
+    def _read_source(self, name, path, start=None, end=None, parcels=None, columns=None):
+        """
+        Lit le CSV source d'un jeu de données. Avec des filtres, seules les
+        colonnes demandées sont lues et les lignes sont filtrées bloc par
+        bloc, sans matérialiser le fichier complet.
+        """
+        date_column = self.datasets[name].get('date_column')
+        parse_dates = None if date_column is None else [date_column]
+        if start is None and end is None and parcels is None and columns is None:
+            dataset = pd.read_csv(path, parse_dates=parse_dates)
+            if date_column is not None:
+                dataset.set_index(date_column, inplace=True)
+            return dataset
+
+        usecols = None
+        if columns is not None:
+            keep = set(columns) | set(KEY_COLUMNS) | {date_column}
+            usecols = [column for column in self._source_columns(name) if column in keep]
+        chunks = []
+        for chunk in pd.read_csv(path, usecols=usecols, parse_dates=parse_dates,
+                                 chunksize=CSV_CHUNK_ROWS):
+            if date_column is not None:
+                chunk.set_index(date_column, inplace=True)
+            chunks.append(self._filter_rows(chunk, start, end, parcels))
+        if not chunks:
+            return self._read_source(name, path).iloc[:0]
+        return pd.concat(chunks)
+
+    @staticmethod
+    def _filter_rows(dataset, start=None, end=None, parcels=None, columns=None):
+        """
+        Conserve les lignes entre start et end (index de dates, bornes
+        incluses) appartenant aux parcelles demandées, puis les colonnes
+        demandées (colonnes clés comprises). Les catégories sans ligne
+        restante sont retirées, comme pour un jeu lu filtré depuis le CSV.
+        """
+        mask = np.ones(len(dataset), dtype=bool)
+        if isinstance(dataset.index, pd.DatetimeIndex):
+            if start is not None:
+                mask &= dataset.index >= start
+            if end is not None:
+                mask &= dataset.index <= end
+        if parcels is not None and 'parcelle_id' in dataset.columns:
+            mask &= dataset['parcelle_id'].isin(parcels).to_numpy()
+        if not mask.all():
+            dataset = dataset[mask]
+            for column in dataset.columns:
+                if isinstance(dataset[column].dtype, pd.CategoricalDtype):
+                    dataset[column] = dataset[column].cat.remove_unused_categories()
+        if columns is not None:
+            keep = set(columns) | set(KEY_COLUMNS)
+            dataset = dataset[[column for column in dataset.columns if column in keep]]
+        return dataset
+
+    @instrumented()
+    def _normalize_dataset(self, name, dataset):
+        """
+        Applique les conversions de types et d'unités propres à chaque
+        jeu de données (dates, Kelvin vers Celsius, types compacts)
+        """
+        # En mode compact, la date reste dans l'index, sans copie en colonne
+        if name == 'yield_history' and not self.compact:
+            dataset['date'] = pd.to_datetime(dataset.index.astype(str), format='%Y', errors='coerce')
+        elif isinstance(dataset.index, pd.DatetimeIndex) and not self.compact:
+            # Convertir les dates en datetime
+            dataset['date'] = pd.to_datetime(dataset.index, errors='coerce')
+
+        if name == 'weather_data' and 'temperature' in dataset.columns:
+            # Standardiser les unités de température (Kelvin à Celsius)
+            if dataset['temperature'].max() > 100:  # Si la température semble être en Kelvin
+                dataset['temperature'] = dataset['temperature'] - 273.15
+                print("Température convertie de Kelvin à Celsius.")
+
+        if self.compact:
+            dataset = self._compact_dtypes(dataset)
+
+        # Tri par parcelle pour l'index des lignes par parcelle
+        if self.datasets[name].get('parcel_index'):
+            dataset = ParcelIndex.sort_by_parcel(dataset)
+        return dataset
+
+    @staticmethod
+    def _compact_dtypes(dataset):
+        """Convertit identifiants et types en catégories, mesures en float32"""
+        for column in dataset.columns:
+            dtype = dataset[column].dtype
+            if column in CATEGORICAL_COLUMNS:
+                if not isinstance(dtype, pd.CategoricalDtype):
+                    dataset[column] = dataset[column].astype('category')
+            elif dtype == np.float64 and column not in FLOAT64_COLUMNS:
+                dataset[column] = dataset[column].astype(np.float32)
+        return dataset
+
+    def _check_dataset(self, name, dataset):
+        """Signale les valeurs manquantes et les dates non converties"""
+        if name in ('monitoring_data', 'weather_data'):
+            # Vérifier les valeurs manquantes
             missing_count = dataset.isnull().sum().sum()
             if missing_count > 0:
-                print(f"Attention : {missing_count} valeurs manquantes détectées dans {dataset_name}.")
-        # Vérifiez si des valeurs n'ont pas pu être converties
-        if self.weather_data['date'].isnull().any():
-            print("Attention : Certaines valeurs dans 'date' n'ont pas pu être converties en datetime dans weather_data.")
-        if self.monitoring_data['date'].isnull().any():
-            print("Attention : Certaines valeurs dans 'date' n'ont pas pu être converties en datetime dans monitoring_data.")
-
-        # Standardiser les unités de température (Kelvin à Celsius)
-        if self.weather_data['temperature'].max() > 100:  # Si la température semble être en Kelvin
-            self.weather_data['temperature'] = self.weather_data['temperature'] - 273.15
-            print("Température convertie de Kelvin à Celsius.")
-        # Harmoniser les dates météo (arrondir à la journée)
+                print(f"Attention : {missing_count} valeurs manquantes détectées dans {name}.")
+            # Vérifiez si des valeurs n'ont pas pu être converties
+            dates = dataset['date'] if 'date' in dataset.columns else dataset.index
+            if dates.isnull().any():
+                print(f"Attention : Certaines valeurs dans 'date' n'ont pas pu être converties en datetime dans {name}.")
     
+    def parcel_index(self, dataset):
+        """
+        Retourne l'index par parcelle d'un jeu de données, construit à partir
+        de la colonne parcelle_id triée au chargement
+        """
+        with self._cache_lock:
+            frame = self.get_dataset(dataset)
+            cached = self._parcel_indexes.get(dataset)
+            if cached is not None and cached[0] is frame:
+                return cached[1]
+
+            if 'parcelle_id' not in frame.columns:
+                raise ValueError(f"La colonne 'parcelle_id' est manquante dans {dataset}.")
+            try:
+                index = ParcelIndex.from_sorted(frame)
+            except ValueError:
+                # Jeu de données affecté directement : on le trie une fois
+                frame = ParcelIndex.sort_by_parcel(frame)
+                self._frames[dataset] = frame
+                index = ParcelIndex.from_sorted(frame)
+
+            self._parcel_indexes[dataset] = (frame, index)
+            return index
+
+    def get_parcel_slice(self, dataset, parcelle_id):
+        """
+        Retourne les lignes d'une parcelle d'un jeu de données
+        (tranche contiguë, sans filtrage sur l'ensemble des lignes)
+        """
+        index = self.parcel_index(dataset)
+        return index.slice(self.get_dataset(dataset), parcelle_id)
+
+    def get_parcel_ids(self, dataset='monitoring_data'):
+        """Retourne la liste triée des parcelles présentes dans un jeu de données"""
+        return self.parcel_index(dataset).non_empty()
+
+    def add_append_listener(self, callback):
+        """
+        Enregistre une fonction appelée avec (dataset, nouvelles lignes)
+        après chaque appel à append_observations
+        """
+        self._append_listeners.append(callback)
+
+    def remove_append_listener(self, callback):
+        """Retire une fonction enregistrée par add_append_listener"""
+        if callback in self._append_listeners:
+            self._append_listeners.remove(callback)
+
+    @instrumented()
+    def append_observations(self, dataset, rows):
+        """
+        Ajoute de nouvelles observations à un jeu de données chargé.
+
+        Seules les nouvelles lignes sont validées et normalisées (dates,
+        Kelvin vers Celsius). L'index par parcelle, les agrégats par parcelle
+        et la matrice de caractéristiques sont mis à jour à partir de ces
+        seules lignes. Retourne les lignes ajoutées après normalisation.
+        """
+        with self._cache_lock:
+            frame = self.get_dataset(dataset)
+            rows = self._validate_rows(dataset, frame, rows)
+            if rows.empty:
+                return rows
+            version = self.dataset_version(dataset)
+            # Le pipeline reste valable après un ajout de monitoring (normalisation
+            # ajustée une fois) ou de météo (table de jointure prolongée)
+            pipeline_current = dataset in ('weather_data', 'monitoring_data') \
+                and self._pipeline_is_current()
+            # La matrice de caractéristiques n'est prolongée que si elle a été
+            # calculée avec ce pipeline, sur les jeux de données actuels
+            matrix_current = pipeline_current and self._feature_matrix is not None \
+                and self._feature_matrix[0] == self._feature_pipeline_key
+
+            frame, rows = self._align_categories(frame, rows)
+            if self.datasets[dataset].get('parcel_index'):
+                combined, index = self.parcel_index(dataset).append(frame, rows)
+            else:
+                combined, index = pd.concat([frame, rows]), None
+                if isinstance(combined.index, pd.DatetimeIndex) and not combined.index.is_monotonic_increasing:
+                    combined = combined.sort_index(kind='mergesort')
+            self._set_frame(dataset, combined)
+            if index is not None:
+                self._parcel_indexes[dataset] = (combined, index)
+            if pipeline_current:
+                self._feature_pipeline_key = self._pipeline_key()
+
+            # Mise à jour incrémentale des artefacts dérivés encore à jour
+            stats = self._parcel_stats.get(dataset)
+            if stats is not None and stats[0] == version:
+                self._parcel_stats[dataset] = (self.dataset_version(dataset), stats[1].update(rows))
+
+            if dataset == 'weather_data' and pipeline_current:
+                self._extend_pipeline_weather(frame, combined, rows)
+                if matrix_current and self._feature_matrix is not None:
+                    self._feature_matrix = (self._feature_pipeline_key, self._feature_matrix[1])
+            if dataset == 'monitoring_data' and matrix_current:
+                features = pd.concat([self._feature_matrix[1], self.prepare_features(rows)],
+                                     ignore_index=True)
+                self._feature_matrix = (self._feature_pipeline_key, features)
+
+        for callback in self._append_listeners:
+            callback(dataset, rows)
+        return rows
+
+    def _validate_rows(self, dataset, frame, rows):
+        """
+        Valide et normalise de nouvelles lignes avant leur ajout
+        (colonnes attendues, dates, types numériques, unités)
+        """
+        if isinstance(rows, dict) and not any(pd.api.types.is_list_like(v) for v in rows.values()):
+            rows = [rows]
+        rows = pd.DataFrame(rows).copy()
+
+        date_column = self.datasets[dataset].get('date_column')
+        if date_column is not None:
+            if date_column in rows.columns:
+                rows = rows.set_index(date_column)
+            rows.index = pd.to_datetime(rows.index, errors='coerce')
+            rows.index.name = frame.index.name
+            invalid = rows.index.isna()
+            if invalid.any():
+                print(f"Attention : {invalid.sum()} lignes ignorées dans {dataset} (dates non convertibles).")
+                rows = rows[~invalid]
+
+        # La colonne 'date' est dérivée de l'index lors de la normalisation
+        expected = [column for column in frame.columns if column != 'date']
+        missing = [column for column in expected if column not in rows.columns]
+        if missing:
+            raise ValueError(f"Colonnes manquantes pour {dataset} : {', '.join(missing)}")
+        rows = rows[expected]
+
+        if 'parcelle_id' in expected and rows['parcelle_id'].isnull().any():
+            raise ValueError(f"Des lignes sans 'parcelle_id' ne peuvent pas être ajoutées à {dataset}.")
+        for column in frame.select_dtypes(include=[np.number]).columns:
+            rows[column] = pd.to_numeric(rows[column], errors='coerce')
+            if frame[column].dtype.kind == 'f':
+                rows[column] = rows[column].astype(frame[column].dtype)
+
+        return self._normalize_dataset(dataset, rows)
+
+    @staticmethod
+    def _align_categories(frame, rows, column='parcelle_id'):
+        """
+        Donne aux colonnes catégorielles des nouvelles lignes les catégories
+        du jeu existant (complétées si besoin), pour que la concaténation
+        conserve le type catégoriel. La colonne des parcelles est gérée par
+        ParcelIndex.append.
+        """
+        for name in frame.columns:
+            dtype = frame[name].dtype
+            if name == column or not isinstance(dtype, pd.CategoricalDtype):
+                continue
+            new_values = pd.Index(rows[name].dropna().unique())
+            if not new_values.isin(dtype.categories).all():
+                categories = dtype.categories.append(new_values.difference(dtype.categories))
+                frame = frame.copy()
+                frame[name] = frame[name].cat.set_categories(categories)
+                dtype = frame[name].dtype
+            rows[name] = rows[name].astype(object).astype(dtype)
+        return frame, rows
+
+    def _extend_pipeline_weather(self, previous, combined, rows):
+        """Prolonge la table météo du pipeline de caractéristiques"""
+        pipeline = self.feature_pipeline
+        if pipeline.weather is previous and combined.index.is_monotonic_increasing:
+            pipeline.weather = combined
+        else:
+            pipeline.extend_weather(rows)
+        if pipeline.derived is not None:
+            pipeline.derived = self.derived_weather_features()
+
+        # Des lignes de monitoring postérieures aux nouvelles observations
+        # météo changeraient de correspondance : la matrice est alors recalculée
+        if self._feature_matrix is not None:
+            # Les grandeurs journalières changent dès le début du jour
+            first_date = min(rows.index.min() - pipeline.tolerance, rows.index.min().floor('D'))
+            if (self.monitoring_data.index >= first_date).any():
+                self._feature_matrix = None
+
+    def get_parcel_statistics(self, dataset):
+        """
+        Retourne les statistiques par parcelle (moyenne, écart type, min,
+        max, effectif) des colonnes numériques d'un jeu de données,
+        mises à jour incrémentalement par append_observations
+        """
+        with self._cache_lock:
+            frame = self.get_dataset(dataset)
+            cached = self._parcel_stats.get(dataset)
+            if cached is None or cached[0] != self.dataset_version(dataset):
+                stats = ParcelStatistics.from_frame(frame)
+                self._parcel_stats[dataset] = (self.dataset_version(dataset), stats)
+            return self._parcel_stats[dataset][1].summary()
+
+    def get_feature_matrix(self):
+        """
+        Retourne la matrice de caractéristiques de l'ensemble des données
+        de monitoring, prolongée incrémentalement par append_observations
+        et recalculée lorsqu'un jeu de données du pipeline est remplacé
+        """
+        with self._cache_lock:
+            key = self._pipeline_key()
+            if self._feature_matrix is None or self._feature_matrix[0] != key:
+                features = self.prepare_features(self.monitoring_data)
+                self._feature_matrix = (key, features)
+            return self._feature_matrix[1]
+
+    def stream_weather(self, chunksize=100_000):
+        """
+        Retourne un lecteur par blocs du fichier météo, produisant la série
+        horaire nettoyée (iter_hourly) et la série journalière agrégée
+        (iter_daily / daily) sans charger le fichier entier en mémoire
+        """
+        return WeatherStream(self.dataset_path('weather_data'), chunksize=chunksize)
+
+    @instrumented()
+    def weather_rollup(self, resolution='D'):
+        """
+        Agrégats de la série météo à une résolution ('h', 'D', 'W' ou 'M') :
+        températures moyenne/min/max, cumul de précipitation, vent maximal...
+        (voir weather_rollups.ROLLUP_AGGREGATIONS).
+
+        Calculés une fois par version de la météo ; ceux de la série lue
+        depuis le fichier source (sans filtre de chargement) sont conservés
+        dans le cache colonnaire, à côté des jeux de données, et invalidés
+        avec lui lorsque le fichier change.
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Résolution inconnue : {resolution} (attendu : {', '.join(RESOLUTIONS)})")
+        with self._cache_lock:
+            weather = self.weather_data
+            version = self.dataset_version('weather_data')
+            if self._weather_rollups is None or self._weather_rollups[0] != version:
+                self._weather_rollups = (version, {})
+            rollups = self._weather_rollups[1]
+            if resolution in rollups:
+                return rollups[resolution]
+
+            persisted = self.cache is not None and self.cache.available \
+                and self._source_versions.get('weather_data') == version \
+                and not self._dataset_filters('weather_data')
+            path = self.dataset_path('weather_data')
+            key = f"weather_data{'.compact' if self.compact else ''}.rollup.{resolution}"
+            rollup = self.cache.load(key, path) if persisted else None
+            if rollup is None:
+                rollup = build_rollup(weather, resolution)
+                if persisted:
+                    self.cache.store(key, path, rollup)
+            rollups[resolution] = rollup
+            return rollup
+
+    def build_weather_rollups(self):
+        """Calcule (ou relit depuis le cache) les agrégats météo de toutes les résolutions"""
+        return {resolution: self.weather_rollup(resolution) for resolution in RESOLUTIONS}
+
+    def query_weather(self, start=None, end=None, min_points=DEFAULT_MIN_POINTS, resolution=None):
+        """
+        Série météo agrégée entre start et end (inclus, par défaut toute la
+        série), à la résolution la plus grossière donnant au moins
+        min_points points sur la période, ou à la résolution demandée.
+
+        Retourne (résolution, agrégats de la période).
+        """
+        weather = self.weather_data
+        if weather.empty:
+            raise ValueError("Aucune donnée météo disponible.")
+        start = weather.index.min() if start is None else pd.Timestamp(start)
+        end = weather.index.max() if end is None else pd.Timestamp(end)
+        if resolution is None:
+            resolution = select_resolution(start, end, min_points)
+        rollup = self.weather_rollup(resolution)
+        # La période contenant start est incluse
+        return resolution, rollup.loc[period_start(pd.DatetimeIndex([start]), resolution)[0]:end]
+
     def _setup_temporal_indices(self):
         """
         Configure les index temporels pour les différentes séries
@@ -113,56 +851,93 @@ class AgriculturalDataManager:
            raise ValueError("Les périodes temporelles des données ne se chevauchent pas")
         return True
 
-    def prepare_features(self, data):
+    @instrumented(rows=None)
+    def fit_feature_pipeline(self, data=None):
+        """
+        Ajuste le pipeline de caractéristiques (jointures précalculées et
+        normalisation) sur l'ensemble des données de monitoring, ou sur
+        data si fourni. Le pipeline est réajusté automatiquement par
+        prepare_features lorsque la météo, le sol, les stations ou le
+        monitoring sont remplacés ou rechargés.
+        """
+        with self._cache_lock:
+            if data is None:
+                data = self.monitoring_data
+            self.feature_pipeline = self._new_feature_pipeline(self.weather_data).fit(data)
+            self._feature_pipeline_key = self._pipeline_key()
+            self.scaler = self.feature_pipeline.scaler
+        return self.feature_pipeline
+
+    def save_feature_pipeline(self, path):
+        """Sérialise le pipeline de caractéristiques ajusté"""
+        if not self._pipeline_is_current():
+            self.fit_feature_pipeline()
+        self.feature_pipeline.save(path)
+
+    def load_feature_pipeline(self, path):
+        """Charge un pipeline de caractéristiques sérialisé"""
+        self.feature_pipeline = FeaturePipeline.load(path)
+        self._feature_pipeline_key = self._pipeline_key()
+        self.scaler = self.feature_pipeline.scaler
+        return self.feature_pipeline
+
+    @instrumented()
+    def prepare_features(self, data, weather=None, n_jobs=None):
         """
            Prépare les caractéristiques pour l'analyse en fusionnant
            les différentes sources de données
-        """
-        try:
-            if not all([self.monitoring_data is not None, self.weather_data is not None, self.soil_data is not None]):
-                raise ValueError("Données insuffisantes pour préparer les caractéristiques. "
-                            "Veuillez vérifier que monitoring_data, weather_data et soil_data sont chargées.")
-        
-        # Création d'une copie des données de monitoring comme base
-            features = data.copy()
-
-        # Fusion avec les données météo
-            features = pd.merge_asof(
-            features.sort_index(),
-            self.weather_data.sort_index(),
-            left_index=True,
-            right_index=True,
-            tolerance=pd.Timedelta('1H')
-        )
 
-        # Fusion avec les données de sol
-            if 'parcelle_id' not in self.soil_data.columns:
-               raise ValueError("La colonne 'parcelle_id' est manquante dans les données de sol.")
-        
-            features = features.merge(self.soil_data, on='parcelle_id', how='left')
+           La normalisation est ajustée une seule fois sur l'ensemble des
+           données de monitoring (fit_feature_pipeline) ; chaque appel ne
+           fait que transformer le lot fourni.
 
-        # Normalisation des caractéristiques numériques
-            numeric_columns = features.select_dtypes(include=[np.number]).columns
-            if len(numeric_columns) == 0:
-               raise ValueError("Aucune colonne numérique trouvée pour la normalisation.")
-        
-            features[numeric_columns] = self.scaler.fit_transform(features[numeric_columns])
+           weather : série météo à fusionner à la place de weather_data,
+           par exemple la série journalière produite par stream_weather()
 
-            return features
+           n_jobs > 1 répartit les parcelles du lot entre plusieurs
+           processus, avec un résultat identique au traitement séquentiel
+        """
+        try:
+            with self._cache_lock:
+                if weather is None:
+                    pipeline = self.feature_pipeline if self._pipeline_is_current() \
+                        else self.fit_feature_pipeline()
+                else:
+                    # Pipeline dédié à une série météo externe, ajusté une fois
+                    # par version des autres jeux de données
+                    key = self._pipeline_key()
+                    if self._custom_pipeline is None or self._custom_pipeline[0] is not weather \
+                            or self._custom_pipeline[1] != key:
+                        pipeline = self._new_feature_pipeline(weather).fit(self.monitoring_data)
+                        self._custom_pipeline = (weather, key, pipeline)
+                    pipeline = self._custom_pipeline[2]
+
+            if n_jobs and n_jobs > 1:
+                return pipeline.transform_parallel(data, n_jobs)
+            return pipeline.transform(data)
 
         except Exception as e:
             raise ValueError(f"Erreur lors de la préparation des caractéristiques : {str(e)}")
         
     ###########
+    def historical_yield_stats(self):
+        """
+        Statistiques historiques de rendement par parcelle (mean, std, min,
+        max), calculées une fois puis mises à jour incrémentalement lors
+        des ajouts à yield_history
+        """
+        statistics = self.get_parcel_statistics('yield_history')
+        return statistics[self._yield_column()][['mean', 'std', 'min', 'max']]
+
     def _enrich_with_yield_history(self, data):
         """
         Enrichit les données actuelles avec les informations
         historiques des rendements
         """
-        # Calcul des statistiques historiques de rendement par parcelle
-        historical_stats = self.yield_history.groupby('parcelle_id').agg({
-            'rendement': ['mean', 'std', 'min', 'max']
-        }).reset_index()
+        # Statistiques historiques de rendement par parcelle (en cache),
+        # en colonnes à plat : <rendement>_mean, <rendement>_std, ...
+        historical_stats = self.historical_yield_stats().add_prefix(f'{self._yield_column()}_')
+        historical_stats = historical_stats.rename_axis('parcelle_id').reset_index()
         
         # Fusion avec les données actuelles
         enriched_data = data.merge(
@@ -173,73 +948,98 @@ class AgriculturalDataManager:
         
         return enriched_data
 
+    @instrumented(rows=None)
+    def compute_temporal_trends(self, value_column=None):
+        """
+        Calcule en une passe les tendances temporelles de toutes les
+        parcelles (moyennes mobiles 7/30 jours, pente, ordonnée à l'origine
+        et variation moyenne). Le résultat est conservé jusqu'au prochain
+        ajout de données de monitoring.
+        """
+        # Identifier la première colonne numérique pour l'analyse
+        if value_column is None:
+            numeric_cols = self.monitoring_data.select_dtypes(include=[np.number]).columns
+            if len(numeric_cols) == 0:
+                raise ValueError("Aucune colonne numérique trouvée pour l'analyse")
+            value_column = numeric_cols[0]
+
+        with self._cache_lock:
+            index = self.parcel_index('monitoring_data')
+            key = (self.dataset_version('monitoring_data'), value_column)
+            if self._temporal_trends is None or self._temporal_trends[0] != key:
+                trends = TemporalTrends(self.monitoring_data, index, value_column)
+                self._temporal_trends = (key, trends)
+            return self._temporal_trends[1]
+
     def get_temporal_patterns(self, parcelle_id: int):
         """
         Analyse les patterns temporels pour une parcelle donnée
+        Retourne l'historique de la parcelle (avec moyennes mobiles
+        ma_7j et ma_30j) et sa tendance linéaire
         """
-        history = "dummy"
-        trend = trend = {
-                'pente': 1.23,
-                'intercept': 5.67,
-                'variation_moyenne': 0.44
-            }
-        return (history,trend)
-        # Filtrage des données pour la parcelle spécifique
-        parcelle_data = self.monitoring_data[
-            self.monitoring_data['parcelle_id'] == parcelle_id
-        ].copy()
-        
-        # Identifier la première colonne numérique pour l'analyse
-        numeric_cols = parcelle_data.select_dtypes(include=[np.number]).columns
-        if len(numeric_cols) == 0:
-           raise ValueError("Aucune colonne numérique trouvée pour l'analyse")
-    
-           target_col = numeric_cols[0]  # Utiliser la première colonne numérique
-    
-    # Calcul des moyennes mobiles
-           parcelle_data['ma_7j'] = parcelle_data[target_col].rolling(window=7).mean()
-           parcelle_data['ma_30j'] = parcelle_data[target_col].rolling(window=30).mean()
-    
-        return (history,trend)
+        trends = self.compute_temporal_trends()
+        history = trends.history(self.monitoring_data, parcelle_id)
+        trend = trends.trend(parcelle_id)
+        return (history, trend)
+
+    @property
+    def risk_scorer(self):
+        """Moteur de score de risque, reconstruit si l'historique des rendements change"""
+        with self._cache_lock:
+            version = self.dataset_version('yield_history')
+            if self._risk_scorer is None or self._risk_scorer[0] != version \
+                    or not self.is_loaded('yield_history'):
+                scorer = RiskScorer(self.historical_yield_stats())
+                self._risk_scorer = (self.dataset_version('yield_history'), scorer)
+            return self._risk_scorer[1]
+
+    def _risk_value_column(self, data):
+        """
+        Colonne de rendement à comparer à l'historique : celle de
+        yield_history (_yield_column), sinon 'valeur'
+        """
+        for column in (self._yield_column(), 'valeur'):
+            if column in data.columns:
+                return column
+        raise ValueError(f"Aucune colonne de rendement ('{self._yield_column()}' ou 'valeur') "
+                         "pour le calcul des risques : préciser value_column.")
 
-    def calculate_risk_metrics(self, data):
+    @instrumented()
+    def calculate_risk_metrics(self, data, value_column=None):
         """
         Calcule les métriques de risque basées sur les conditions
         actuelles et l'historique
+
+        Toutes les lignes sont scorées en une passe : écart à la moyenne
+        historique de leur parcelle, rapporté à l'écart type
+        (deviation_from_mean), puis score logistique (risk_score).
+
+        value_column : colonne de rendement des lignes (par défaut la
+        colonne de rendement de yield_history, sinon 'valeur')
         """
-        risk_metrics = pd.DataFrame()
-        # Identifier la colonne cible pour le calcul des risques
-        numeric_cols = data.select_dtypes(include=[np.number]).columns
-        if len(numeric_cols) == 0:
-           raise ValueError("Aucune colonne numérique trouvée pour le calcul des risques")
-    
-        target_col = numeric_cols[0]  # Utiliser la première colonne numérique
-    
-        if 'rendement' in self.yield_history:
-            mean_yield = self.yield_history['rendement'].mean()
-            std_yield = self.yield_history['rendement'].std()
-        # Calcul des écarts par rapport aux moyennes historiques
-            risk_metrics['deviation_from_mean'] = (
-            data['valeur'] - data['rendement']['mean']
-            ) / data['rendement']['std']
-        
-        # Calcul du score de risque
-            risk_metrics['risk_score'] = 1 / (1 + np.exp(-risk_metrics['deviation_from_mean']))
-        return risk_metrics
-        return features
+        if value_column is None:
+            value_column = self._risk_value_column(data)
+        return self.risk_scorer.score_frame(data, value_column)
+
+    def iter_risk_metrics(self, batches, value_column=None):
+        """
+        Score des lots de nouvelles observations au fur et à mesure de leur
+        arrivée, avec les statistiques historiques en cache
+        """
+        for batch in batches:
+            yield self.calculate_risk_metrics(batch, value_column)
 
+    @instrumented(rows=lambda result: len(result['trend']))
     def analyze_yield_patterns(self, parcelle_id):
         """
         Réalise une analyse approfondie des patterns de rendement
         """
         # Extraction et préparation des données
-        history = self.yield_history[
-            self.yield_history['parcelle_id'] == parcelle_id
-        ].copy()
+        history = self.get_parcel_slice('yield_history', parcelle_id)
         
         # Décomposition temporelle
         decomposition = seasonal_decompose(
-            history['rendement'],
+            history[self._yield_column()],
             period=12,  # Période annuelle
             extrapolate_trend='freq'
         )
@@ -248,4 +1048,109 @@ class AgriculturalDataManager:
             'trend': decomposition.trend,
             'seasonal': decomposition.seasonal,
             'residual': decomposition.resid
-        }
\ No newline at end of file
+        }
+
+    @instrumented()
+    def analyze_yield_patterns_batch(self, parcelle_ids=None, period=12, n_jobs=None):
+        """
+        Décompose en une seule passe les rendements de toutes les parcelles
+        (ou de parcelle_ids) : tendance par moyenne mobile et saisonnalité
+        calculées sur un tableau parcelles x périodes.
+
+        n_jobs > 1 répartit les parcelles entre plusieurs processus.
+        Retourne un tableau unique : parcelle_id, date, observed, trend,
+        seasonal, residual.
+        """
+        if parcelle_ids is None:
+            history = self.yield_history
+        else:
+            history = pd.concat([self.get_parcel_slice('yield_history', parcelle_id)
+                                 for parcelle_id in parcelle_ids])
+        return decompose_frame(history, self._yield_column(), period=period, n_jobs=n_jobs)
+
+    def _yield_column(self):
+        """Colonne de rendement à analyser ('rendement', sinon 'rendement_estime')"""
+        if 'rendement' in self.yield_history.columns:
+            return 'rendement'
+        return 'rendement_estime'
+
+
+class DatasetCacheWriter:
+    def __init__(self, manager, name):
+        """
+        Alimente l'entrée du cache d'un jeu de données au fil de l'écriture
+        de son CSV : chaque bloc CSV (write_csv, en-tête compris) est lu et
+        normalisé comme au chargement, puis ajouté à l'entrée. L'entrée est
+        mise en place par close(), une fois le CSV complet et fermé.
+
+        Les blocs d'un jeu indexé par parcelle doivent se suivre par
+        parcelles croissantes : leur concaténation est alors triée comme
+        le jeu normalisé en une fois.
+        """
+        self.manager = manager
+        self.name = name
+        self._writer = manager.cache.writer(manager._cache_key(name), manager.dataset_path(name))
+        self._last_parcel = None
+        self._missing_parcel = False
+
+    def write_csv(self, source):
+        """Lit, normalise et ajoute un bloc CSV (chemin ou fichier ouvert)"""
+        spec = self.manager.datasets[self.name]
+        date_column = spec.get('date_column')
+        chunk = pd.read_csv(source, parse_dates=None if date_column is None else [date_column])
+        if date_column is not None:
+            chunk.set_index(date_column, inplace=True)
+        chunk = self.manager._normalize_dataset(self.name, chunk)
+
+        if spec.get('parcel_index') and len(chunk):
+            # Identifiants manquants placés en fin de bloc : seul le dernier bloc peut en avoir
+            parcels = chunk['parcelle_id'].dropna()
+            if self._missing_parcel or (len(parcels) and self._last_parcel is not None
+                                        and parcels.iloc[0] < self._last_parcel):
+                raise ValueError(f"Les blocs de {self.name} doivent se suivre par parcelles croissantes.")
+            if len(parcels):
+                self._last_parcel = parcels.iloc[-1]
+            self._missing_parcel = len(parcels) < len(chunk)
+        self._writer.write(chunk)
+
+    def close(self):
+        """Met en place l'entrée du cache (le CSV source doit être complet)"""
+        self._writer.close()
+
+    def abort(self):
+        """Abandonne l'entrée en cours d'écriture"""
+        self._writer.abort()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def shared_data_manager(data_root=None, **options):
+    """
+    Retourne le gestionnaire de données partagé par toutes les sessions du
+    processus pour data_root et options (paramètres d'AgriculturalDataManager).
+
+    Les jeux de données sont chargés une seule fois, en lecture seule et
+    sans copie depuis le cache colonnaire mappé en mémoire (shared=True) :
+    les processus d'un même serveur partagent les mêmes pages. Chaque
+    session ne conserve que son propre état (parcelle sélectionnée, séries
+    de la parcelle), par exemple :
+
+        dashboard = AgriculturalDashboard(shared_data_manager())
+    """
+    options['shared'] = True
+    root = os.path.abspath(data_root or DEFAULT_DATA_ROOT)
+    key = (root, repr(sorted(options.items())))
+    with _shared_managers_lock:
+        manager = _shared_managers.get(key)
+        if manager is None:
+            manager = AgriculturalDataManager(data_root=root, **options)
+            manager.load_data()
+            _shared_managers[key] = manager
+    return manager
\ No newline at end of file
@@ -0,0 +1,130 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _trend_weights(period):
+    """Poids de la moyenne mobile centrée (identiques à seasonal_decompose)"""
+    if period % 2 == 0:
+        return np.array([0.5] + [1] * (period - 1) + [0.5]) / period
+    return np.repeat(1.0 / period, period)
+
+
+def _linear_fill(trend, positions, mask, target):
+    """
+    Ajuste par moindres carrés une droite par ligne sur les points de mask
+    et remplace les valeurs de target par la droite extrapolée
+    """
+    x = np.where(mask, positions, 0.0)
+    y = np.where(mask, trend, 0.0)
+    n = mask.sum(axis=1)
+    sx, sy = x.sum(axis=1), y.sum(axis=1)
+    sxx, sxy = (x * x).sum(axis=1), (x * y).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+        intercept = (sy - slope * sx) / n
+    line = positions * slope[:, None] + intercept[:, None]
+    return np.where(target, line, trend)
+
+
+def _extrapolate_trend(trend, npoints):
+    """
+    Prolonge la tendance aux extrémités de chaque ligne par régression
+    linéaire sur les npoints valeurs définies les plus proches
+    """
+    n_obs = trend.shape[1]
+    positions = np.arange(n_obs, dtype=float)[None, :]
+    defined = ~np.isnan(trend)
+    has_trend = defined.any(axis=1)
+    front = np.where(has_trend, defined.argmax(axis=1), 0)[:, None]
+    back = np.where(has_trend, n_obs - 1 - defined[:, ::-1].argmax(axis=1), -1)[:, None]
+    front_last = np.minimum(front + npoints, back)
+    back_first = np.maximum(front, back - npoints)
+
+    rows = has_trend[:, None]
+    trend = _linear_fill(trend, positions,
+                         (positions >= front) & (positions < front_last),
+                         rows & (positions < front))
+    trend = _linear_fill(trend, positions,
+                         (positions >= back_first) & (positions < back),
+                         rows & (positions > back))
+    return trend
+
+
+def decompose(values, period=12):
+    """
+    Décomposition additive (tendance, saisonnalité, résidu) de plusieurs
+    séries à la fois, équivalente à seasonal_decompose(...,
+    extrapolate_trend='freq') appliqué à chaque ligne.
+
+    values : tableau séries x périodes, NaN en dehors de chaque série
+    Retourne les tableaux (trend, seasonal, residual) de même forme.
+    """
+    values = np.asarray(values, dtype=float)
+    n_series, n_obs = values.shape
+    observed = ~np.isnan(values)
+
+    # Moyenne mobile centrée
+    weights = _trend_weights(period)
+    width, half = len(weights), len(weights) // 2
+    trend = np.full_like(values, np.nan)
+    if n_obs >= width:
+        trend[:, half:n_obs - half] = sliding_window_view(values, width, axis=1) @ weights
+    trend = _extrapolate_trend(trend, period)
+    trend[~observed] = np.nan
+
+    # Moyennes saisonnières par position dans la période
+    detrended = values - trend
+    n_cycles = -(-n_obs // period)
+    padded = np.full((n_series, n_cycles * period), np.nan)
+    padded[:, :n_obs] = detrended
+    with np.errstate(invalid='ignore'):
+        counts = (~np.isnan(padded)).reshape(n_series, n_cycles, period).sum(axis=1)
+        sums = np.nansum(padded.reshape(n_series, n_cycles, period), axis=1)
+        period_averages = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+    period_averages -= period_averages.mean(axis=1, keepdims=True)
+
+    seasonal = period_averages[:, np.arange(n_obs) % period]
+    seasonal[~observed] = np.nan
+    residual = detrended - seasonal
+    return trend, seasonal, residual
+
+
+def _decompose_chunk(args):
+    values, period = args
+    return decompose(values, period)
+
+
+def decompose_frame(data, value_column, period=12, group_column='parcelle_id', n_jobs=None):
+    """
+    Décompose la série de chaque groupe (parcelle) d'un jeu de données
+    indexé par date et retourne un tableau unique au format long :
+    groupe, date, observed, trend, seasonal, residual.
+
+    n_jobs > 1 répartit les séries entre plusieurs processus.
+    """
+    table = data.pivot_table(index=group_column, columns=data.index, values=value_column,
+                             aggfunc='mean', observed=True)
+    values = table.to_numpy(dtype=float)
+
+    if n_jobs and n_jobs > 1 and len(values) > 1:
+        chunks = np.array_split(values, min(n_jobs, len(values)))
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            parts = list(executor.map(_decompose_chunk, [(chunk, period) for chunk in chunks]))
+        trend, seasonal, residual = (np.vstack(part) for part in zip(*parts))
+    else:
+        trend, seasonal, residual = decompose(values, period)
+
+    groups = np.repeat(table.index.to_numpy(), values.shape[1])
+    dates = np.tile(table.columns.to_numpy(), values.shape[0])
+    result = pd.DataFrame({
+        group_column: groups,
+        'date': dates,
+        'observed': values.ravel(),
+        'trend': trend.ravel(),
+        'seasonal': seasonal.ravel(),
+        'residual': residual.ravel(),
+    })
+    return result[~np.isnan(result['observed'].to_numpy())].reset_index(drop=True)
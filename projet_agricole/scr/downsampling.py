@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+
+def _as_float(x):
+    """Convertit des abscisses (dates comprises) en flottants"""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    return x.astype(float)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Sélectionne n_out points par l'algorithme Largest-Triangle-Three-Buckets.
+    Le premier et le dernier point sont toujours conservés.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = _as_float(x)
+    y = np.asarray(y, dtype=float)
+    # Les valeurs manquantes ne doivent pas dominer le calcul des aires
+    y = np.where(np.isnan(y), np.nanmean(y) if not np.isnan(y).all() else 0.0, y)
+
+    # Bornes des n_out - 2 seaux intermédiaires
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Point moyen du seau suivant
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        indices[bucket + 1] = previous
+    return indices
+
+
+def minmax_indices(y, n_buckets):
+    """
+    Conserve le minimum et le maximum de chaque seau (2 * n_buckets points
+    au plus), ce qui préserve les pics de la série
+    """
+    n = len(y)
+    if 2 * n_buckets >= n or n_buckets < 1:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=float)
+    filled_low = np.where(np.isnan(y), np.inf, y)
+    filled_high = np.where(np.isnan(y), -np.inf, y)
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)[:-1]
+
+    # Position du minimum et du maximum dans chaque seau
+    bucket = np.repeat(np.arange(n_buckets), np.diff(np.append(edges, n)))
+    order_low = np.lexsort((filled_low, bucket))
+    order_high = np.lexsort((-filled_high, bucket))
+    lows = order_low[edges]
+    highs = order_high[edges]
+    return np.unique(np.concatenate([lows, highs, [0, n - 1]]))
+
+
+def downsample(frame, y_column, n_points, start=None, end=None, method='lttb'):
+    """
+    Retourne les lignes d'une série temporelle (index de dates trié)
+    visibles entre start et end, réduites à n_points environ.
+
+    Un point de part et d'autre de la fenêtre est conservé pour que les
+    lignes se prolongent jusqu'aux bords du graphique.
+    """
+    index = frame.index
+    first = 0 if start is None else max(int(index.searchsorted(pd.Timestamp(start), side='left')) - 1, 0)
+    last = len(frame) if end is None else min(int(index.searchsorted(pd.Timestamp(end), side='right')) + 1, len(frame))
+    window = frame.iloc[first:last]
+
+    if len(window) <= n_points:
+        return window
+    if method == 'minmax':
+        positions = minmax_indices(window[y_column].to_numpy(), max(n_points // 2, 1))
+    else:
+        positions = lttb_indices(window.index.to_numpy(), window[y_column].to_numpy(), n_points)
+    return window.iloc[positions]
@@ -0,0 +1,152 @@
+# export_dashboards.py
+# Export HTML statique d'un tableau de bord par parcelle, réparti entre
+# plusieurs processus qui partagent le même gestionnaire de données
+# (shared_data_manager : jeux chargés une fois, mappés en mémoire).
+#
+# Exemples :
+#   python export_dashboards.py rapports/
+#   python export_dashboards.py rapports/ --parcels P001 P002 --jobs 4 --resources inline
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from bokeh.embed import file_html
+from bokeh.resources import CDN, Resources
+from bokeh.util.paths import bokehjs_path
+
+from dashboard import AgriculturalDashboard
+from data_manager import shared_data_manager
+
+RESOURCE_MODES = ('cdn', 'inline')
+# Répertoire (relatif aux pages) des scripts BokehJS copiés en mode inline
+STATIC_DIR = 'static'
+
+# État des processus d'export, fixé par _init_worker
+_worker_state = {}
+
+
+def export_filename(parcelle_id):
+    """Nom du fichier HTML d'une parcelle (caractères non sûrs remplacés)"""
+    return re.sub(r'[^\w.-]', '_', str(parcelle_id)) + '.html'
+
+
+def shared_resources(output_dir, mode='cdn'):
+    """
+    Ressources BokehJS communes à toutes les pages : liens vers le CDN, ou
+    scripts copiés une seule fois dans output_dir/static et référencés par
+    chemin relatif (pages consultables hors ligne sans dupliquer BokehJS)
+    """
+    if mode not in RESOURCE_MODES:
+        raise ValueError(f"Mode de ressources inconnu : {mode} (attendu : {', '.join(RESOURCE_MODES)})")
+    if mode == 'cdn':
+        return CDN
+    resources = Resources(mode='server', root_url='./')
+    for url in resources.js_files + resources.css_files:
+        relative = url.split('?')[0][len('./'):]
+        source = os.path.join(bokehjs_path(), os.path.relpath(relative, STATIC_DIR))
+        target = os.path.join(output_dir, relative)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(source, target)
+    return resources
+
+
+def _init_worker(data_root, options, output_dir, resources):
+    """Prépare un processus d'export (gestionnaire partagé déjà chargé si hérité par fork)"""
+    _worker_state['manager'] = shared_data_manager(data_root, **options)
+    _worker_state['output_dir'] = output_dir
+    _worker_state['resources'] = resources
+
+
+def _export_parcel(parcelle_id):
+    """Construit, rend et écrit le tableau de bord d'une parcelle ; retourne sa mesure"""
+    start = time.perf_counter()
+    # Les messages d'avancement du tableau de bord ne sont pas affichés
+    with contextlib.redirect_stdout(io.StringIO()):
+        dashboard = AgriculturalDashboard(_worker_state['manager'], parcelle_id=parcelle_id,
+                                          interactive=False)
+        try:
+            layout = dashboard.create_layout()
+            html = file_html(layout, _worker_state['resources'], title=f"Parcelle {parcelle_id}")
+        finally:
+            dashboard.close()
+    path = os.path.join(_worker_state['output_dir'], export_filename(parcelle_id))
+    with open(path, 'w', encoding='utf-8') as handle:
+        handle.write(html)
+    return {'parcelle_id': parcelle_id, 'path': path, 'seconds': time.perf_counter() - start,
+            'bytes': os.path.getsize(path)}
+
+
+def export_dashboards(output_dir, parcels=None, data_root=None, n_jobs=None,
+                      resources='cdn', verbose=True, **options):
+    """
+    Exporte un fichier HTML par parcelle (toutes les parcelles du
+    monitoring par défaut) dans output_dir.
+
+    Le gestionnaire de données est chargé une fois (shared_data_manager,
+    options : paramètres d'AgriculturalDataManager) puis hérité par les
+    n_jobs processus (par défaut le nombre de cœurs). Affiche l'avancement
+    et la durée de chaque fichier ; retourne les mesures par parcelle, dans
+    l'ordre des parcelles.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manager = shared_data_manager(data_root, **options)
+    if parcels is None:
+        parcels = manager.get_parcel_ids()
+    parcels = list(parcels)
+    bokeh_resources = shared_resources(output_dir, resources)
+    initargs = (data_root, options, output_dir, bokeh_resources)
+    n_jobs = max(1, min(n_jobs or os.cpu_count() or 1, len(parcels) or 1))
+
+    def report(done, result):
+        if verbose:
+            print(f"[{done}/{len(parcels)}] {os.path.basename(result['path'])} : "
+                  f"{result['seconds'] * 1000:.0f} ms, {result['bytes'] / 1024:.0f} Ko")
+
+    start = time.perf_counter()
+    results = {}
+    if n_jobs == 1:
+        _init_worker(*initargs)
+        for parcelle_id in parcels:
+            results[parcelle_id] = _export_parcel(parcelle_id)
+            report(len(results), results[parcelle_id])
+    else:
+        # fork : les processus héritent du gestionnaire déjà chargé
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=context,
+                                 initializer=_init_worker, initargs=initargs) as executor:
+            futures = [executor.submit(_export_parcel, parcelle_id) for parcelle_id in parcels]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result['parcelle_id']] = result
+                report(len(results), result)
+
+    if verbose:
+        elapsed = time.perf_counter() - start
+        print(f"{len(results)} tableaux de bord exportés dans {output_dir} "
+              f"en {elapsed:.1f} s ({n_jobs} processus)")
+    return [results[parcelle_id] for parcelle_id in parcels]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export HTML des tableaux de bord par parcelle.")
+    parser.add_argument('output_dir', help="répertoire des fichiers HTML")
+    parser.add_argument('--data-root', help="répertoire des données (par défaut data/)")
+    parser.add_argument('--parcels', nargs='+', help="parcelles à exporter (par défaut toutes)")
+    parser.add_argument('--jobs', type=int, help="nombre de processus (par défaut le nombre de cœurs)")
+    parser.add_argument('--resources', choices=RESOURCE_MODES, default='cdn',
+                        help="BokehJS depuis le CDN, ou copié une fois à côté des pages")
+    args = parser.parse_args(argv)
+    export_dashboards(args.output_dir, parcels=args.parcels, data_root=args.data_root,
+                      n_jobs=args.jobs, resources=args.resources)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from instrumentation import INSTRUMENTATION
+from spatial_join import StationWeatherJoin
+
+# Colonne technique portant la position d'origine des lignes d'un lot
+POSITION_COLUMN = '__position__'
+# Nombre de lots par processus, pour équilibrer la charge entre processus
+CHUNKS_PER_JOB = 4
+
+# Pipeline et lot courants des processus de travail : hérités par fork,
+# ou transmis une seule fois par processus à l'initialisation
+_worker_state = {}
+
+
+def _init_worker(pipeline, data):
+    _worker_state['pipeline'] = pipeline
+    _worker_state['data'] = data
+
+
+def _transform_positions(positions):
+    """Transforme les lignes d'un lot désignées par leurs positions"""
+    chunk = _worker_state['data'].iloc[positions]
+    chunk = chunk.assign(**{POSITION_COLUMN: positions})
+    return _worker_state['pipeline'].transform(chunk)
+
+
+def partition_by_parcel(parcel_ids, n_chunks):
+    """
+    Répartit les positions des lignes en n_chunks lots de tailles proches,
+    sans partager une parcelle entre deux lots (les lignes sans parcelle
+    forment un groupe à part)
+    """
+    codes, uniques = pd.factorize(parcel_ids)
+    codes = np.where(codes < 0, len(uniques), codes)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.cumsum(np.bincount(codes, minlength=len(uniques) + 1))
+
+    # Coupures aux fins de parcelle les plus proches de tailles égales
+    targets = np.linspace(0, len(order), n_chunks + 1)[1:-1]
+    cuts = np.unique(bounds[np.minimum(np.searchsorted(bounds, targets), len(bounds) - 1)])
+    return [chunk for chunk in np.split(order, cuts) if len(chunk)]
+
+
+class FeaturePipeline:
+    def __init__(self, weather, soil, tolerance='1h', stations=None, neighbors=1, derived=None):
+        """
+        Pipeline de préparation des caractéristiques : ajusté une seule fois
+        puis appliqué à chaque nouveau lot de données de monitoring.
+
+        Les tables de jointure sont précalculées à la construction :
+        météo triée par date (merge_asof sans tri à chaque appel) et
+        données de sol indexées par parcelle.
+
+        stations : coordonnées des stations météo (station_id, latitude,
+        longitude) lorsque la météo couvre plusieurs stations (colonne
+        station_id). Chaque parcelle reçoit alors la météo de sa station la
+        plus proche, ou un mélange pondéré des neighbors plus proches.
+
+        derived : grandeurs agronomiques journalières (indexées par jour, par
+        station le cas échéant) ajoutées à chaque ligne selon son jour.
+        """
+        if 'parcelle_id' not in soil.columns:
+            raise ValueError("La colonne 'parcelle_id' est manquante dans les données de sol.")
+
+        self.weather = weather if weather.index.is_monotonic_increasing \
+            else weather.sort_index(kind='mergesort')
+        self.soil = soil.set_index('parcelle_id')
+        self.tolerance = pd.Timedelta(tolerance)
+        self.stations = None if stations is None \
+            else StationWeatherJoin(stations, self.soil, neighbors)
+        self.derived = derived
+        self.scaler = StandardScaler()
+        self.numeric_columns = None  # Colonnes normalisées, fixées par fit()
+
+    @property
+    def is_fitted(self):
+        """Indique si le pipeline a déjà été ajusté"""
+        return self.numeric_columns is not None
+
+    def extend_weather(self, rows):
+        """Ajoute de nouvelles observations météo à la table de jointure"""
+        weather = pd.concat([self.weather, rows])
+        if not weather.index.is_monotonic_increasing:
+            weather = weather.sort_index(kind='mergesort')
+        self.weather = weather
+
+    def merge(self, data):
+        """
+        Fusionne un lot de monitoring avec la météo (par date) et le sol
+        (par parcelle), sans normalisation
+        """
+        data = data.sort_index(kind='mergesort')
+        with INSTRUMENTATION.stage('FeaturePipeline.merge.weather') as stage:
+            if self.stations is not None:
+                features = self.stations.merge(data, self.weather, self.tolerance)
+            else:
+                features = pd.merge_asof(
+                    data,
+                    self.weather,
+                    left_index=True,
+                    right_index=True,
+                    tolerance=self.tolerance
+                )
+            stage.rows = len(features)
+        if self.derived is not None:
+            with INSTRUMENTATION.stage('FeaturePipeline.merge.derived'):
+                features = self._merge_derived(features)
+        with INSTRUMENTATION.stage('FeaturePipeline.merge.soil'):
+            features = features.join(self.soil, on='parcelle_id')
+        return features.reset_index(drop=True)
+
+    def _merge_derived(self, features):
+        """Ajoute à chaque ligne les grandeurs agronomiques de son jour"""
+        days = features.index.floor('D')
+        derived = self.derived
+        station_column = None if self.stations is None else self.stations.id_column
+        if station_column is not None and station_column in derived.columns:
+            keys = pd.MultiIndex.from_arrays([features[station_column].astype(object), days])
+            derived = derived.set_index(station_column, append=True).swaplevel()
+        else:
+            keys = days
+        values = derived.reindex(keys)
+        features = features.copy()
+        for column in values.columns:
+            features[column] = values[column].to_numpy()
+        return features
+
+    def fit(self, data):
+        """Ajuste la normalisation sur un jeu de données de référence"""
+        features = self.merge(data)
+        numeric_columns = features.select_dtypes(include=[np.number]).columns
+        if len(numeric_columns) == 0:
+            raise ValueError("Aucune colonne numérique trouvée pour la normalisation.")
+
+        self.scaler.fit(features[numeric_columns])
+        self.numeric_columns = list(numeric_columns)
+        return self
+
+    def transform(self, data):
+        """Fusionne et normalise un nouveau lot avec les paramètres ajustés"""
+        if not self.is_fitted:
+            raise ValueError("Le pipeline de caractéristiques n'a pas été ajusté (appeler fit).")
+
+        features = self.merge(data)
+        with INSTRUMENTATION.stage('FeaturePipeline.transform.scale'):
+            features[self.numeric_columns] = self.scaler.transform(features[self.numeric_columns])
+        return features
+
+    def transform_parallel(self, data, n_jobs=None):
+        """
+        Transforme un lot en répartissant ses parcelles entre n_jobs
+        processus (par défaut le nombre de cœurs). Les tables de jointure
+        et le lot sont hérités par fork quand c'est possible, sinon transmis
+        une seule fois à chaque processus ; seules les positions des lignes
+        circulent ensuite. Le résultat est identique à transform(data).
+        """
+        if not self.is_fitted:
+            raise ValueError("Le pipeline de caractéristiques n'a pas été ajusté (appeler fit).")
+        n_jobs = n_jobs or os.cpu_count() or 1
+        chunks = partition_by_parcel(data['parcelle_id'], n_jobs * CHUNKS_PER_JOB)
+        if n_jobs == 1 or len(chunks) < 2:
+            return self.transform(data)
+
+        if 'fork' in multiprocessing.get_all_start_methods():
+            _init_worker(self, data)
+            executor = ProcessPoolExecutor(max_workers=n_jobs,
+                                           mp_context=multiprocessing.get_context('fork'))
+        else:
+            executor = ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                           initargs=(self, data))
+        try:
+            with executor:
+                parts = list(executor.map(_transform_positions, chunks))
+        finally:
+            _worker_state.clear()
+
+        # Ordre du traitement séquentiel : tri stable des lignes par date
+        serial = pd.Series(np.arange(len(data)), index=data.index).sort_index(kind='mergesort')
+        rank = np.empty(len(data), dtype=np.int64)
+        rank[serial.to_numpy()] = np.arange(len(data))
+
+        features = pd.concat(parts, ignore_index=True)
+        positions = features.pop(POSITION_COLUMN).to_numpy()
+        features = features.iloc[np.argsort(rank[positions])]
+        return features.reset_index(drop=True)
+
+    def fit_transform(self, data):
+        """Ajuste le pipeline puis transforme le même lot"""
+        return self.fit(data).transform(data)
+
+    def save(self, path):
+        """Sérialise le pipeline ajusté (tables de jointure comprises)"""
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        """Charge un pipeline sérialisé par save()"""
+        pipeline = joblib.load(path)
+        if not isinstance(pipeline, FeaturePipeline):
+            raise ValueError(f"Le fichier {path} ne contient pas un pipeline de caractéristiques.")
+        return pipeline
@@ -0,0 +1,199 @@
+import functools
+import json
+import logging
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger('agricultural.performance')
+
+
+def row_count(result):
+    """Nombre de lignes d'un résultat (tableau, série, ou premier élément d'un tuple)"""
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    shape = getattr(result, 'shape', None)
+    return shape[0] if shape else None
+
+
+class _Stage:
+    def __init__(self, instrumentation, name):
+        """Mesure d'une étape (durée, lignes, variation mémoire)"""
+        self.instrumentation = instrumentation
+        self.name = name
+        self.rows = None
+
+    def __enter__(self):
+        self.memory = tracemalloc.get_traced_memory()[0] if self.instrumentation.track_memory \
+            and tracemalloc.is_tracing() else None
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        duration = time.perf_counter() - self.start
+        memory_delta = None
+        if self.memory is not None and tracemalloc.is_tracing():
+            memory_delta = tracemalloc.get_traced_memory()[0] - self.memory
+        self.instrumentation.record(self.name, duration, self.rows, memory_delta,
+                                    failed=exc_type is not None)
+        return False
+
+
+class _NullStage:
+    """Étape sans mesure, utilisée quand l'instrumentation est désactivée"""
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Instrumentation:
+    def __init__(self):
+        """
+        Mesures des étapes coûteuses : durée, nombre de lignes produites et
+        variation de la mémoire allouée (tracemalloc, en option).
+
+        Désactivée par défaut : chaque étape instrumentée ne coûte alors
+        qu'un test d'attribut. Une fois activée, chaque mesure est journalisée
+        (logger 'agricultural.performance', niveau DEBUG), agrégée par étape
+        et transmise aux fonctions enregistrées par add_hook.
+        """
+        self.enabled = False
+        self.track_memory = False
+        self._hooks = []
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._started_tracemalloc = False
+
+    def enable(self, track_memory=False, hook=None):
+        """Active les mesures (et le suivi mémoire, plus coûteux, si demandé)"""
+        self.track_memory = track_memory
+        if track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        if hook is not None:
+            self.add_hook(hook)
+        self.enabled = True
+
+    def disable(self):
+        """Désactive les mesures ; les agrégats déjà collectés sont conservés"""
+        self.enabled = False
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        self.track_memory = False
+
+    def add_hook(self, callback):
+        """
+        Enregistre une fonction appelée avec un dictionnaire (stage,
+        duration_s, rows, memory_delta_bytes, failed, timestamp) par mesure
+        """
+        self._hooks.append(callback)
+
+    def remove_hook(self, callback):
+        """Retire une fonction enregistrée par add_hook"""
+        if callback in self._hooks:
+            self._hooks.remove(callback)
+
+    def stage(self, name):
+        """Contexte mesurant une étape : with INSTRUMENTATION.stage('nom') as stage: ..."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, duration, rows=None, memory_delta=None, failed=False):
+        """Enregistre une mesure, la journalise et la transmet aux fonctions enregistrées"""
+        with self._lock:
+            stats = self._stats.setdefault(name, {'count': 0, 'errors': 0, 'total_s': 0.0,
+                                                  'max_s': 0.0, 'rows': 0, 'memory_delta_bytes': 0})
+            stats['count'] += 1
+            stats['errors'] += int(failed)
+            stats['total_s'] += duration
+            stats['max_s'] = max(stats['max_s'], duration)
+            stats['rows'] += rows or 0
+            stats['memory_delta_bytes'] += memory_delta or 0
+
+        if logger.isEnabledFor(logging.DEBUG):
+            details = [f"{duration * 1000:.1f} ms"]
+            if rows is not None:
+                details.append(f"{rows} lignes")
+            if memory_delta is not None:
+                details.append(f"{memory_delta / 2 ** 20:+.1f} Mo")
+            logger.debug("%s : %s%s", name, ', '.join(details), ' (erreur)' if failed else '')
+
+        if self._hooks:
+            event = {'stage': name, 'duration_s': duration, 'rows': rows,
+                     'memory_delta_bytes': memory_delta, 'failed': failed,
+                     'timestamp': time.time()}
+            for callback in list(self._hooks):
+                callback(event)
+
+    def reset(self):
+        """Efface les agrégats collectés"""
+        with self._lock:
+            self._stats = {}
+
+    def snapshot(self):
+        """Agrégats par étape (nombre d'appels, erreurs, durées, lignes, mémoire)"""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def to_json(self):
+        """Agrégats au format JSON"""
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+    def to_prometheus(self, prefix='agri'):
+        """Agrégats au format texte d'exposition de Prometheus"""
+        snapshot = self.snapshot()
+        # (famille, type, description, [(suffixe, clé de l'agrégat)])
+        families = [
+            ('stage_duration_seconds', 'summary', "Durée des étapes",
+             [('_sum', 'total_s'), ('_count', 'count')]),
+            ('stage_duration_seconds_max', 'gauge', "Durée maximale des étapes", [('', 'max_s')]),
+            ('stage_errors_total', 'counter', "Exécutions terminées par une erreur", [('', 'errors')]),
+            ('stage_rows_total', 'counter', "Lignes produites par les étapes", [('', 'rows')]),
+            ('stage_memory_delta_bytes_total', 'gauge',
+             "Variation cumulée de la mémoire allouée", [('', 'memory_delta_bytes')]),
+        ]
+        lines = []
+        for family, kind, description, samples in families:
+            name = f'{prefix}_{family}'
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            for stage, stats in sorted(snapshot.items()):
+                label = stage.replace('\\', '\\\\').replace('"', '\\"')
+                for suffix, key in samples:
+                    lines.append(f'{name}{suffix}{{stage="{label}"}} {stats[key]}')
+        return '\n'.join(lines) + '\n'
+
+
+# Instance partagée par le gestionnaire de données et le tableau de bord
+INSTRUMENTATION = Instrumentation()
+
+
+def instrumented(stage=None, rows=row_count):
+    """
+    Décorateur mesurant chaque appel d'une fonction ou d'une méthode.
+
+    stage : nom de l'étape (par défaut le nom qualifié de la fonction)
+    rows : fonction calculant le nombre de lignes à partir du résultat
+    """
+    def decorator(func):
+        name = stage or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not INSTRUMENTATION.enabled:
+                return func(*args, **kwargs)
+            with _Stage(INSTRUMENTATION, name) as measure:
+                result = func(*args, **kwargs)
+                measure.rows = rows(result) if rows is not None else None
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+
+class ParcelIndex:
+    def __init__(self, parcels, offsets):
+        """
+        Index des lignes par parcelle d'un jeu de données trié par parcelle.
+
+        parcels : identifiants de parcelle triés
+        offsets : bornes des lignes, la parcelle i occupant les lignes
+                  offsets[i]:offsets[i + 1]
+        """
+        self.parcels = list(parcels)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self._positions = {parcelle_id: i for i, parcelle_id in enumerate(self.parcels)}
+
+    @staticmethod
+    def sort_by_parcel(dataset, column='parcelle_id'):
+        """
+        Trie un jeu de données par parcelle (tri stable, l'ordre des dates
+        est conservé) et convertit la colonne en catégorie ordonnée
+        """
+        ids = dataset[column]
+        if isinstance(ids.dtype, pd.CategoricalDtype):
+            categories = sorted(ids.cat.categories)
+        else:
+            categories = sorted(ids.dropna().unique())
+        ids = pd.Categorical(ids, categories=categories, ordered=True)
+
+        # Les identifiants manquants (code -1) sont placés en fin de tableau
+        codes = np.where(ids.codes < 0, len(categories), ids.codes)
+        order = np.argsort(codes, kind='stable')
+        dataset = dataset.iloc[order].copy()
+        dataset[column] = ids[order]
+        return dataset
+
+    @classmethod
+    def from_sorted(cls, dataset, column='parcelle_id'):
+        """Construit l'index d'un jeu de données déjà trié par sort_by_parcel"""
+        ids = dataset[column]
+        if not isinstance(ids.dtype, pd.CategoricalDtype):
+            raise ValueError(f"La colonne '{column}' doit être catégorielle pour être indexée.")
+
+        codes = ids.cat.codes.to_numpy()
+        valid = codes[codes >= 0]
+        if len(valid) and (np.diff(valid) < 0).any():
+            raise ValueError(f"Le jeu de données n'est pas trié par '{column}'.")
+
+        counts = np.bincount(valid, minlength=len(ids.cat.categories))
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        return cls(ids.cat.categories, offsets)
+
+    def __contains__(self, parcelle_id):
+        return parcelle_id in self._positions
+
+    def __len__(self):
+        return len(self.parcels)
+
+    def non_empty(self):
+        """Retourne les parcelles ayant au moins une ligne"""
+        counts = np.diff(self.offsets)
+        return [parcelle_id for parcelle_id, count in zip(self.parcels, counts) if count > 0]
+
+    def bounds(self, parcelle_id):
+        """Retourne les positions (début, fin) des lignes d'une parcelle"""
+        position = self._positions.get(parcelle_id)
+        if position is None:
+            return 0, 0
+        return int(self.offsets[position]), int(self.offsets[position + 1])
+
+    def slice(self, dataset, parcelle_id):
+        """Retourne les lignes d'une parcelle sans parcourir le jeu de données"""
+        start, end = self.bounds(parcelle_id)
+        return dataset.iloc[start:end]
+
+    def append(self, dataset, rows, column='parcelle_id'):
+        """
+        Insère de nouvelles lignes dans un jeu de données trié par parcelle,
+        à la fin du bloc de leur parcelle, sans retrier les lignes existantes.
+
+        Retourne le jeu de données étendu et son nouvel index.
+        """
+        old_ids = dataset[column]
+        new_ids = rows[column]
+        new_values = set(new_ids.dropna().unique())
+        categories = list(old_ids.cat.categories)
+        if not new_values.issubset(categories):
+            categories = sorted(set(categories) | new_values)
+            old_ids = old_ids.cat.set_categories(categories)
+        old_ids = pd.Categorical(old_ids, categories=categories, ordered=True)
+        new_ids = pd.Categorical(new_ids, categories=categories, ordered=True)
+        n_categories = len(categories)
+
+        # Les identifiants manquants occupent un dernier bloc (code n_categories)
+        old_keys = np.where(old_ids.codes < 0, n_categories, old_ids.codes)
+        new_keys = np.where(new_ids.codes < 0, n_categories, new_ids.codes)
+        new_order = np.argsort(new_keys, kind='stable')
+        new_keys = new_keys[new_order]
+
+        old_counts = np.bincount(old_keys, minlength=n_categories + 1)
+        new_counts = np.bincount(new_keys, minlength=n_categories + 1)
+        shift = np.concatenate([[0], np.cumsum(new_counts)[:-1]])
+        old_end = np.cumsum(old_counts)
+
+        # Position finale de chaque ligne existante et de chaque nouvelle ligne
+        n_old, n_new = len(old_keys), len(new_keys)
+        order = np.empty(n_old + n_new, dtype=np.int64)
+        order[np.arange(n_old) + shift[old_keys]] = np.arange(n_old)
+        order[old_end[new_keys] + np.arange(n_new)] = n_old + new_order
+
+        dataset = dataset.copy()
+        dataset[column] = old_ids
+        rows = rows.copy()
+        rows[column] = new_ids
+        combined = pd.concat([dataset, rows]).iloc[order]
+
+        offsets = np.concatenate([[0], np.cumsum(old_counts + new_counts)[:n_categories]])
+        return combined, ParcelIndex(categories, offsets)
+
+
+class ParcelStatistics:
+    def __init__(self, count, total, squares, minimum, maximum):
+        """
+        Agrégats par parcelle des colonnes numériques (effectif, somme,
+        somme des carrés, minimum, maximum), combinables de façon
+        incrémentale lors de l'ajout de nouvelles observations
+        """
+        self.count = count
+        self.total = total
+        self.squares = squares
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @classmethod
+    def from_frame(cls, dataset, columns=None, column='parcelle_id'):
+        """Calcule les agrégats par parcelle d'un jeu de données"""
+        if columns is None:
+            columns = dataset.select_dtypes(include=[np.number]).columns
+        values = dataset[list(columns)].astype(float)
+        grouped = values.groupby(dataset[column], observed=True)
+        return cls(
+            grouped.count(),
+            grouped.sum(),
+            (values ** 2).groupby(dataset[column], observed=True).sum(),
+            grouped.min(),
+            grouped.max(),
+        )
+
+    def update(self, rows, column='parcelle_id'):
+        """Intègre de nouvelles lignes aux agrégats existants"""
+        other = ParcelStatistics.from_frame(rows, self.count.columns, column)
+        self.count = self.count.add(other.count, fill_value=0)
+        self.total = self.total.add(other.total, fill_value=0)
+        self.squares = self.squares.add(other.squares, fill_value=0)
+        self.minimum = self.minimum.combine(other.minimum, np.fmin)
+        self.maximum = self.maximum.combine(other.maximum, np.fmax)
+        return self
+
+    def summary(self):
+        """
+        Retourne moyenne, écart type, minimum, maximum et effectif par
+        parcelle, avec des colonnes (variable, statistique)
+        """
+        count = self.count.where(self.count > 0)
+        mean = self.total / count
+        variance = (self.squares - count * mean ** 2) / (count - 1)
+        std = np.sqrt(variance.clip(lower=0))
+        stats = {'mean': mean, 'std': std, 'min': self.minimum,
+                 'max': self.maximum, 'count': self.count}
+        summary = pd.concat(stats, axis=1).swaplevel(axis=1)
+        return summary[[(c, s) for c in self.count.columns for s in stats]]
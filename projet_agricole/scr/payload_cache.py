@@ -0,0 +1,182 @@
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Taille maximale par défaut des données conservées (octets)
+DEFAULT_MAX_BYTES = 64 * 2 ** 20
+
+# Cache partagé par toutes les sessions du processus
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def _root(array):
+    """Tableau propriétaire de la mémoire d'une vue numpy"""
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array
+
+
+def _pandas_arrays(values):
+    """Tableaux numpy ou Arrow portant les valeurs d'une colonne ou d'un index pandas"""
+    if isinstance(values, pd.RangeIndex):
+        return []  # Index calculé, sans tableau
+    if isinstance(values.dtype, np.dtype):
+        return [np.asarray(values)]
+    values = values.array
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return [values.codes]  # Catégories partagées avec le type de la colonne
+    if hasattr(values, '__arrow_array__'):
+        return [values.__arrow_array__()]
+    return [values]
+
+
+def _collect(payload, roots, sizes):
+    """Parcourt des données préparées : tableaux numpy par propriétaire, autres tailles"""
+    if isinstance(payload, pd.DataFrame):
+        _collect(_pandas_arrays(payload.index), roots, sizes)
+        for position in range(payload.shape[1]):
+            _collect(_pandas_arrays(payload.iloc[:, position]), roots, sizes)
+    elif isinstance(payload, pd.Series):
+        _collect(_pandas_arrays(payload.index) + _pandas_arrays(payload), roots, sizes)
+    elif isinstance(payload, pd.Index):
+        _collect(_pandas_arrays(payload), roots, sizes)
+    elif isinstance(payload, np.ndarray):
+        root = _root(payload)
+        entry = roots.setdefault(id(root), [root, 0])
+        entry[1] += payload.nbytes
+        if payload.dtype == object:
+            sizes.append(sum(sys.getsizeof(value) for value in payload.ravel()))
+    elif isinstance(payload, pa.ChunkedArray):
+        _collect(payload.chunks, roots, sizes)
+    elif isinstance(payload, pa.Array):
+        # Tranche d'un tableau Arrow plus grand : mémoire du tableau d'origine
+        if payload.nbytes >= payload.get_total_buffer_size():
+            sizes.append(payload.nbytes)
+    elif isinstance(payload, dict):
+        _collect(list(payload.values()), roots, sizes)
+    elif isinstance(payload, (list, tuple)):
+        for value in payload:
+            _collect(value, roots, sizes)
+    elif hasattr(payload, 'nbytes'):
+        sizes.append(int(payload.nbytes))
+    else:
+        sizes.append(sys.getsizeof(payload))
+
+
+def payload_size(payload):
+    """
+    Taille approximative (octets) de la mémoire propre à des données
+    préparées : tableaux, dictionnaires, listes.
+
+    Seuls les tableaux dont les données sont entièrement référencées
+    sont comptés, une seule fois par tableau propriétaire : une tranche
+    d'un jeu de données du gestionnaire (vue sur une partie d'un tableau
+    plus grand) n'est pas comptée.
+    """
+    roots, sizes = {}, []
+    _collect(payload, roots, sizes)
+    owned = sum(root.nbytes for root, referenced in roots.values() if referenced >= root.nbytes)
+    return owned + sum(sizes)
+
+
+class PayloadCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Cache LRU des données préparées par parcelle, borné en octets.
+
+        Toutes les entrées sont associées à une version des données
+        (par exemple AgriculturalDataManager.data_version) : une lecture ou
+        une écriture avec une autre version vide le cache. Les compteurs
+        (stats()) permettent d'ajuster max_bytes au nombre de parcelles
+        consultées.
+        """
+        if max_bytes <= 0:
+            raise ValueError("La taille maximale du cache doit être positive.")
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # clé -> (données, taille)
+        self._version = None
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        """Vide le cache si la version des données a changé (appelé sous verrou)"""
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._version = version
+
+    def get(self, key, version=None):
+        """Retourne les données en cache pour key, ou None"""
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, payload, version=None, size=None):
+        """
+        Conserve des données pour key, en évinçant les entrées les moins
+        récemment utilisées au-delà de max_bytes. Des données plus grandes
+        que max_bytes ne sont pas conservées.
+        """
+        size = payload_size(payload) if size is None else size
+        with self._lock:
+            self._check_version(version)
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (payload, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        """Vide le cache (les compteurs sont conservés)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Compteurs du cache : succès, échecs, évictions, invalidations, occupation"""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+def shared_payload_cache():
+    """Cache des données préparées partagé par toutes les sessions (créé au premier appel)"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = PayloadCache()
+        return _shared_cache
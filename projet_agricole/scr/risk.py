@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+
+class RiskScorer:
+    def __init__(self, historical_stats):
+        """
+        Score de risque par rapport à l'historique des rendements.
+
+        historical_stats : statistiques par parcelle (index parcelle_id,
+        colonnes mean, std, min, max), calculées une seule fois.
+        """
+        self.historical_stats = historical_stats
+        self.parcels = pd.Index(historical_stats.index.astype(str))
+        self.mean = historical_stats['mean'].to_numpy(dtype=float)
+        self.std = historical_stats['std'].to_numpy(dtype=float)
+
+    def _positions(self, parcelle_ids):
+        """Position de chaque parcelle dans les statistiques (-1 si inconnue)"""
+        # Les identifiants distincts sont peu nombreux : seuls eux sont recherchés
+        if not isinstance(parcelle_ids, (pd.Series, pd.Index, np.ndarray)):
+            parcelle_ids = np.asarray(parcelle_ids, dtype=object)
+        codes, uniques = pd.factorize(parcelle_ids)
+        unique_positions = self.parcels.get_indexer(pd.Index(uniques).astype(str))
+        return np.where(codes >= 0, unique_positions[codes], -1)
+
+    def score(self, parcelle_ids, values):
+        """
+        Calcule en une passe l'écart normalisé à la moyenne historique de la
+        parcelle (z-score) et le score de risque logistique associé.
+        Les parcelles sans historique obtiennent des valeurs manquantes.
+        """
+        values = np.asarray(values, dtype=float)
+        if len(self.mean) == 0:
+            # Aucun historique : aucune parcelle ne peut être scorée
+            missing = np.full(len(values), np.nan)
+            return missing, missing.copy()
+
+        positions = self._positions(parcelle_ids)
+        known = positions >= 0
+        mean = np.where(known, self.mean[positions], np.nan)
+        std = np.where(known, self.std[positions], np.nan)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            deviation = (values - mean) / std
+            risk_score = 1 / (1 + np.exp(-deviation))
+        return deviation, risk_score
+
+    def score_frame(self, data, value_column, parcel_column='parcelle_id'):
+        """Score les lignes d'un tableau ; l'index du tableau est conservé"""
+        deviation, risk_score = self.score(data[parcel_column], data[value_column])
+        return pd.DataFrame({'deviation_from_mean': deviation, 'risk_score': risk_score},
+                            index=data.index)
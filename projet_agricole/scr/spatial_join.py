@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+# Rayon moyen de la Terre (km), pour convertir les distances haversine
+EARTH_RADIUS_KM = 6371.0088
+# Colonne technique portant le code de station lors des merge_asof groupés
+STATION_CODE = '__station__'
+# Colonnes d'angles (degrés) : mélangées comme vecteurs unitaires, 350° et
+# 10° donnant 0° et non 180°
+CIRCULAR_COLUMNS = ('direction_vent',)
+
+
+class StationIndex:
+    def __init__(self, stations, id_column='station_id'):
+        """
+        Index spatial des stations météo (BallTree en distance haversine),
+        construit une seule fois à partir de leurs coordonnées.
+
+        stations : tableau avec les colonnes id_column, latitude et longitude
+        """
+        missing = [column for column in (id_column, 'latitude', 'longitude')
+                   if column not in stations.columns]
+        if missing:
+            raise ValueError(f"Colonnes manquantes dans les stations météo : {', '.join(missing)}")
+        stations = stations.dropna(subset=['latitude', 'longitude'])
+        if stations.empty:
+            raise ValueError("Aucune station météo avec des coordonnées valides.")
+
+        self.station_ids = stations[id_column].to_numpy()
+        coordinates = np.radians(stations[['latitude', 'longitude']].to_numpy(dtype=float))
+        self.tree = BallTree(coordinates, metric='haversine')
+
+    def __len__(self):
+        return len(self.station_ids)
+
+    def query(self, latitude, longitude, k=1):
+        """
+        Retourne les distances (km) et les positions des k stations les plus
+        proches de chaque point, triées par distance croissante
+        """
+        k = min(k, len(self))
+        points = np.radians(np.column_stack([latitude, longitude]).astype(float))
+        distances, positions = self.tree.query(points, k=k)
+        return distances * EARTH_RADIUS_KM, positions
+
+
+def idw_weights(distances, power=2):
+    """
+    Poids par inverse de la distance, normalisés par ligne. Une station
+    située exactement sur le point reçoit la totalité du poids.
+    """
+    distances = np.asarray(distances, dtype=float)
+    with np.errstate(divide='ignore'):
+        weights = 1.0 / distances ** power
+    exact = distances == 0
+    has_exact = exact.any(axis=1)
+    weights[has_exact] = exact[has_exact]
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+class StationWeatherJoin:
+    def __init__(self, stations, soil, neighbors=1, power=2, id_column='station_id'):
+        """
+        Jointure spatiale de la météo : chaque parcelle (coordonnées des
+        données de sol, indexées par parcelle_id) est rattachée une fois pour
+        toutes à sa station la plus proche, ou aux neighbors stations les
+        plus proches avec des poids par inverse de la distance.
+        """
+        self.id_column = id_column
+        self.index = StationIndex(stations, id_column)
+        self.neighbors = min(neighbors, len(self.index))
+        self.stations = pd.Index(self.index.station_ids)
+
+        # Parcelles sans coordonnées : aucune station (code -1)
+        located = soil[['latitude', 'longitude']].notna().all(axis=1).to_numpy()
+        codes = np.full((len(soil), self.neighbors), -1, dtype=np.int64)
+        weights = np.zeros((len(soil), self.neighbors))
+        distances = np.full((len(soil), self.neighbors), np.nan)
+        if located.any():
+            found, positions = self.index.query(soil['latitude'].to_numpy()[located],
+                                                soil['longitude'].to_numpy()[located],
+                                                self.neighbors)
+            codes[located], distances[located] = positions, found
+            weights[located] = idw_weights(found, power)
+
+        self.parcels = pd.Index(soil.index)
+        self.codes = codes
+        self.weights = weights
+        self.distances = distances
+        self._weather_codes = None  # (table météo, code de station de chaque ligne)
+
+    def assignment(self):
+        """Stations, distances (km) et poids retenus pour chaque parcelle"""
+        columns = {}
+        for rank in range(self.neighbors):
+            codes = self.codes[:, rank]
+            columns[f'station_{rank + 1}'] = np.where(
+                codes >= 0, self.index.station_ids[np.maximum(codes, 0)], None)
+            columns[f'distance_{rank + 1}'] = self.distances[:, rank]
+            columns[f'poids_{rank + 1}'] = self.weights[:, rank]
+        return pd.DataFrame(columns, index=self.parcels)
+
+    def _station_codes(self, weather):
+        """Code de station de chaque ligne météo (calculé une fois par table)"""
+        if self._weather_codes is None or self._weather_codes[0] is not weather:
+            codes = self.stations.get_indexer(weather[self.id_column].astype(object))
+            self._weather_codes = (weather, codes)
+        return self._weather_codes[1]
+
+    def merge(self, data, weather, tolerance):
+        """
+        Fusionne un lot de monitoring trié par date avec la météo de ses
+        stations, par merge_asof groupé par station.
+
+        Les colonnes produites ne dépendent pas de neighbors : celles de la
+        station la plus proche. Avec plusieurs stations par parcelle, les
+        colonnes numériques sont remplacées par la moyenne pondérée des
+        stations disponibles à cette date (moyenne des vecteurs unitaires
+        pour les angles de CIRCULAR_COLUMNS).
+        """
+        parcel_positions = self.parcels.get_indexer(data['parcelle_id'].astype(object))
+        known = parcel_positions >= 0
+        right = weather.drop(columns=self.id_column)
+        right[STATION_CODE] = self._station_codes(weather)
+
+        def rank_codes(rank):
+            return np.where(known, self.codes[parcel_positions, rank], -1)
+
+        nearest = rank_codes(0)
+        station = np.where(nearest >= 0, self.index.station_ids[np.maximum(nearest, 0)], None)
+        left = data.assign(**{STATION_CODE: nearest})
+        merged = pd.merge_asof(left, right, left_index=True, right_index=True,
+                               by=STATION_CODE, tolerance=tolerance)
+        merged[STATION_CODE] = station
+        merged = merged.rename(columns={STATION_CODE: self.id_column})
+        if self.neighbors == 1:
+            return merged
+
+        # Mélange pondéré : les stations sans observation à cette date sont
+        # écartées et les poids restants renormalisés
+        numeric = list(right.drop(columns=STATION_CODE).select_dtypes(include=[np.number]).columns)
+        # Noms des colonnes météo dans le résultat (suffixe de merge_asof si
+        # la colonne existe aussi dans le lot)
+        outputs = [f'{column}_y' if column in data.columns else column for column in numeric]
+        circular = np.array([column in CIRCULAR_COLUMNS for column in numeric])
+        totals = np.zeros((len(data), len(numeric)))
+        sines = np.zeros((len(data), len(numeric)))
+        weight_sums = np.zeros((len(data), len(numeric)))
+        for rank in range(self.neighbors):
+            if rank == 0:
+                values = merged[outputs].to_numpy(dtype=float)
+            else:
+                left = pd.DataFrame({STATION_CODE: rank_codes(rank)}, index=data.index)
+                values = pd.merge_asof(left, right[numeric + [STATION_CODE]], left_index=True,
+                                       right_index=True, by=STATION_CODE, tolerance=tolerance)
+                values = values[numeric].to_numpy(dtype=float)
+            weights = np.where(known, self.weights[parcel_positions, rank], 0.0)[:, None]
+            available = ~np.isnan(values)
+            values = np.where(available, values, 0.0)
+            angles = np.radians(values)
+            # Angles : cosinus dans totals, sinus à part
+            totals += np.where(circular, np.cos(angles), values) * weights
+            sines += np.where(circular, np.sin(angles), 0.0) * weights
+            weight_sums += available * weights
+        with np.errstate(invalid='ignore', divide='ignore'):
+            blended = np.where(weight_sums > 0, totals / weight_sums, np.nan)
+            directions = (np.degrees(np.arctan2(sines, totals)) + 360) % 360
+        blended = np.where(circular & (weight_sums > 0), directions, blended)
+
+        for position, column in enumerate(outputs):
+            dtype = merged[column].dtype
+            # Les colonnes flottantes gardent leur précision (float32 en mode compact)
+            merged[column] = blended[:, position].astype(dtype) \
+                if pd.api.types.is_float_dtype(dtype) else blended[:, position]
+        return merged
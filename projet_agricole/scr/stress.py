@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+
+# Niveaux de stress hydrique : intervalles (0, 0.05], (0.05, 0.1], (0.1, 1]
+STRESS_LEVELS = ["Faible", "Modéré", "Élevé"]
+STRESS_BINS = np.array([0, 0.05, 0.1, 1])
+
+# Type de stress selon la température (°C) : conditions météo hors [5, 30]
+STRESS_TYPES = ["Stress Hydrique", "Conditions Météo"]
+TEMPERATURE_MIN = 5
+TEMPERATURE_MAX = 30
+
+
+def classify_stress(stress_hydrique, temperature):
+    """
+    Classe chaque observation par niveau de stress hydrique et type de stress.
+
+    Retourne deux tableaux de codes : indice dans STRESS_LEVELS (-1 hors
+    intervalles) et indice dans STRESS_TYPES. Les stress manquants valent 0
+    et les températures manquantes prennent la moyenne.
+    """
+    stress = np.nan_to_num(np.asarray(stress_hydrique, dtype=float), nan=0.0)
+    temperature = np.asarray(temperature, dtype=float)
+    if np.isnan(temperature).any():
+        temperature = np.where(np.isnan(temperature), np.nanmean(temperature), temperature)
+
+    # Intervalles fermés à droite, comme pd.cut
+    levels = np.searchsorted(STRESS_BINS, stress, side='left') - 1
+    levels[(stress <= STRESS_BINS[0]) | (stress > STRESS_BINS[-1])] = -1
+
+    types = ((temperature > TEMPERATURE_MAX) | (temperature < TEMPERATURE_MIN)).astype(np.int64)
+    return levels, types
+
+
+def stress_contingency(stress_hydrique, temperature):
+    """
+    Table de contingence niveau de stress hydrique x type de stress,
+    avec toutes les combinaisons (comptes nuls compris)
+    """
+    levels, types = classify_stress(stress_hydrique, temperature)
+    valid = levels >= 0
+    cells = levels[valid] * len(STRESS_TYPES) + types[valid]
+    counts = np.bincount(cells, minlength=len(STRESS_LEVELS) * len(STRESS_TYPES))
+
+    return pd.DataFrame({
+        'stress_hydrique_level': np.repeat(STRESS_LEVELS, len(STRESS_TYPES)),
+        'stress_type': np.tile(STRESS_TYPES, len(STRESS_LEVELS)),
+        'count': counts,
+    })
@@ -1,5 +1,5 @@
 from bokeh.plotting import output_file, save, show
-from dashboard import AgriculturalDashboard
+from dashboard import ALL_PARCELS, AgriculturalDashboard
 from data_manager import AgriculturalDataManager
 
 # Initialisation
@@ -18,6 +18,6 @@ merged_data = data_manager.prepare_features(data_manager.monitoring_data)
 print("Aperçu des données fusionnées :")
 print(merged_data.columns)
 
-stress_data = dashboard.prepare_stress_data()
-print("Données préparées pour la matrice de stress :")
+stress_data = dashboard.prepare_stress_data(ALL_PARCELS)
+print("Données préparées pour la matrice de stress (toutes les parcelles) :")
 print(stress_data)
\ No newline at end of file
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+
+def _segment_sums(values, offsets):
+    """Sommes par segment offsets[i]:offsets[i + 1] à partir de sommes cumulées"""
+    cumulative = np.concatenate([[0.0], np.cumsum(values)])
+    return cumulative[offsets[1:]] - cumulative[offsets[:-1]]
+
+
+def grouped_rolling_mean(values, offsets, window):
+    """
+    Moyenne mobile sur window lignes, calculée séparément dans chaque
+    segment offsets[i]:offsets[i + 1] (fenêtre complète exigée, comme
+    pandas rolling(window).mean())
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    valid = ~np.isnan(values)
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+
+    positions = np.arange(n)
+    starts = np.repeat(offsets[:-1], np.diff(offsets))
+    window_start = positions + 1 - window
+    complete = window_start >= starts
+    window_start = np.maximum(window_start, 0)
+
+    window_sums = sums[positions + 1] - sums[window_start]
+    window_counts = counts[positions + 1] - counts[window_start]
+    return np.where(complete & (window_counts == window), window_sums / window, np.nan)
+
+
+def grouped_linear_trend(x, y, offsets):
+    """
+    Pente et ordonnée à l'origine des moindres carrés de y en fonction de x
+    pour chaque segment, à partir de sommes cumulées (O(n), sans ajustement
+    de modèle par segment). Les valeurs manquantes sont ignorées.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    valid = ~np.isnan(x) & ~np.isnan(y)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+
+    n = _segment_sums(valid.astype(float), offsets)
+    sx, sy = _segment_sums(x, offsets), _segment_sums(y, offsets)
+    sxx, sxy = _segment_sums(x * x, offsets), _segment_sums(x * y, offsets)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+        intercept = (sy - slope * sx) / n
+    return slope, intercept
+
+
+def grouped_mean_variation(values, offsets):
+    """Variation relative moyenne d'une ligne à la suivante dans chaque segment"""
+    values = np.asarray(values, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change = np.empty_like(values)
+        change[0:1] = np.nan
+        change[1:] = values[1:] / values[:-1] - 1
+    # La première ligne d'un segment n'a pas de ligne précédente
+    change[offsets[:-1][offsets[:-1] < len(values)]] = np.nan
+    change[~np.isfinite(change)] = np.nan
+
+    valid = ~np.isnan(change)
+    counts = _segment_sums(valid.astype(float), offsets)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return _segment_sums(np.where(valid, change, 0.0), offsets) / counts
+
+
+class TemporalTrends:
+    def __init__(self, dataset, index, value_column):
+        """
+        Tendances temporelles de toutes les parcelles d'un jeu de données
+        trié par parcelle : moyennes mobiles 7 et 30 jours, pente et
+        ordonnée à l'origine (par jour depuis la première observation de
+        la parcelle) et variation moyenne.
+        """
+        self.value_column = value_column
+        self.index = index
+        offsets = index.offsets
+        # Les lignes sans parcelle (en fin de tableau) sont ignorées
+        dataset = dataset.iloc[:offsets[-1]]
+        values = dataset[value_column].to_numpy(dtype=float)
+
+        self.ma_7j = grouped_rolling_mean(values, offsets, 7)
+        self.ma_30j = grouped_rolling_mean(values, offsets, 30)
+
+        # Jours écoulés depuis la première observation de chaque parcelle
+        dates = dataset.index.to_numpy().astype('datetime64[ns]').astype(np.int64)
+        first = dates[np.minimum(offsets[:-1], len(dates) - 1)] if len(dates) else np.zeros(len(index))
+        days = (dates - np.repeat(first, np.diff(offsets))) / 86_400e9
+        slope, intercept = grouped_linear_trend(days, values, offsets)
+
+        self.trends = pd.DataFrame({
+            'pente': slope,
+            'intercept': intercept,
+            'variation_moyenne': grouped_mean_variation(values, offsets),
+        }, index=pd.Index(index.parcels, name='parcelle_id'))
+
+    def history(self, dataset, parcelle_id):
+        """Lignes d'une parcelle avec leurs moyennes mobiles"""
+        start, end = self.index.bounds(parcelle_id)
+        history = dataset.iloc[start:end].copy()
+        history['ma_7j'] = self.ma_7j[start:end]
+        history['ma_30j'] = self.ma_30j[start:end]
+        return history
+
+    def trend(self, parcelle_id):
+        """Pente, ordonnée à l'origine et variation moyenne d'une parcelle"""
+        if parcelle_id not in self.index:
+            raise ValueError(f"Parcelle inconnue : {parcelle_id}")
+        return self.trends.loc[parcelle_id].to_dict()
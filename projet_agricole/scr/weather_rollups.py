@@ -0,0 +1,72 @@
+import pandas as pd
+
+# Résolutions des agrégats météo, de la plus fine à la plus grossière :
+# période pandas et durée (approximative pour le mois) d'un pas
+RESOLUTIONS = {
+    'h': ('h', pd.Timedelta(hours=1)),
+    'D': ('D', pd.Timedelta(days=1)),
+    'W': ('W', pd.Timedelta(weeks=1)),
+    'M': ('M', pd.Timedelta(days=30.44)),
+}
+
+# Agrégations de chaque résolution : températures moyenne/min/max, cumul de
+# précipitation, rayonnement et humidité moyens, vent maximal
+ROLLUP_AGGREGATIONS = {
+    'temperature': ('temperature', 'mean'),
+    'temperature_min': ('temperature', 'min'),
+    'temperature_max': ('temperature', 'max'),
+    'humidite': ('humidite', 'mean'),
+    'precipitation': ('precipitation', 'sum'),
+    'rayonnement_solaire': ('rayonnement_solaire', 'mean'),
+    'vitesse_vent': ('vitesse_vent', 'max'),
+}
+
+# Nombre minimal de points par défaut d'une requête (query_weather)
+DEFAULT_MIN_POINTS = 100
+
+
+def period_start(index, resolution):
+    """Début de la période (heure, jour, semaine commençant le lundi, mois) de chaque date"""
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Résolution inconnue : {resolution} (attendu : {', '.join(RESOLUTIONS)})")
+    freq = RESOLUTIONS[resolution][0]
+    if resolution in ('h', 'D'):
+        return index.floor(freq)
+    return index.to_period(freq).start_time
+
+
+def build_rollup(weather, resolution, station_column='station_id'):
+    """
+    Agrège la série météo à une résolution (par station le cas échéant).
+    Chaque ligne est indexée par le début de sa période ; nb_mesures
+    compte les observations agrégées. Les périodes sans observation sont
+    absentes.
+    """
+    aggregations = {name: spec for name, spec in ROLLUP_AGGREGATIONS.items()
+                    if spec[0] in weather.columns}
+    keys = [period_start(weather.index, resolution).rename(weather.index.name or 'date')]
+    stations = station_column in weather.columns
+    if stations:
+        keys.insert(0, weather[station_column].astype(object).rename(station_column))
+
+    grouped = weather.groupby(keys, observed=True)
+    rollup = grouped.agg(**aggregations)
+    rollup['nb_mesures'] = grouped.size()
+    if stations:
+        # Index de dates trié, comme la série d'origine
+        rollup = rollup.reset_index(station_column).sort_index(kind='mergesort')
+    return rollup
+
+
+def select_resolution(start, end, min_points=DEFAULT_MIN_POINTS):
+    """
+    Résolution la plus grossière donnant au moins min_points points entre
+    start et end (l'heure si aucune n'y suffit)
+    """
+    span = pd.Timestamp(end) - pd.Timestamp(start)
+    if span < pd.Timedelta(0):
+        raise ValueError("La date de début doit précéder la date de fin.")
+    for resolution in reversed(list(RESOLUTIONS)):
+        if span // RESOLUTIONS[resolution][1] + 1 >= min_points:
+            return resolution
+    return 'h'
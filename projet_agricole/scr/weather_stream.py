@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+
+# Agrégations journalières appliquées aux séries horaires nettoyées
+DAILY_AGGREGATIONS = {
+    'temperature_min': ('temperature', 'min'),
+    'temperature_max': ('temperature', 'max'),
+    'temperature_moyenne': ('temperature', 'mean'),
+    'precipitation': ('precipitation', 'sum'),
+    'rayonnement_solaire': ('rayonnement_solaire', 'sum'),
+}
+
+
+def to_celsius(dataset):
+    """Convertit la température en Celsius si elle semble exprimée en Kelvin"""
+    if 'temperature' in dataset and dataset['temperature'].max() > 100:
+        dataset['temperature'] = dataset['temperature'] - 273.15
+    return dataset
+
+
+def aggregate_daily(hourly):
+    """
+    Agrège une série horaire en série journalière
+    (températures min/max/moyenne, cumuls de précipitation et de rayonnement)
+    """
+    aggregations = {name: spec for name, spec in DAILY_AGGREGATIONS.items()
+                    if spec[0] in hourly.columns}
+    daily = hourly.groupby(hourly.index.floor('D')).agg(**aggregations)
+    daily.index.name = hourly.index.name
+    return daily
+
+
+class WeatherStream:
+    def __init__(self, path, chunksize=100_000, date_column='date'):
+        """
+        Lecture par blocs du fichier météo horaire.
+
+        Le fichier doit être trié par date. Chaque bloc est rééchantillonné
+        à l'heure puis interpolé ; seules les lignes postérieures à la
+        dernière heure complète sont conservées entre deux blocs, ce qui
+        borne la mémoire utilisée tout en donnant le même résultat que
+        resample('H').mean().interpolate() sur le fichier entier.
+        """
+        self.path = path
+        self.chunksize = chunksize
+        self.date_column = date_column
+
+    def _read_chunks(self):
+        """Lit le CSV par blocs avec dates converties et températures en Celsius"""
+        reader = pd.read_csv(self.path, parse_dates=[self.date_column],
+                             chunksize=self.chunksize)
+        for chunk in reader:
+            chunk = chunk.set_index(self.date_column)
+            yield to_celsius(chunk.select_dtypes(include=[np.number]))
+
+    @staticmethod
+    def _clean(raw, anchor):
+        """Rééchantillonne à l'heure et interpole en s'appuyant sur la ligne d'ancrage"""
+        if anchor is not None:
+            raw = pd.concat([anchor, raw])
+        hourly = raw.resample('h').mean().interpolate()
+        return hourly.iloc[1:] if anchor is not None else hourly
+
+    def iter_hourly(self):
+        """Génère les blocs de la série horaire nettoyée"""
+        pending = None  # Lignes brutes en attente du bloc suivant
+        anchor = None   # Dernière heure émise sans valeur manquante
+
+        for chunk in self._read_chunks():
+            raw = chunk if pending is None else pd.concat([pending, chunk])
+            if raw.empty:
+                continue
+
+            # La dernière heure peut se poursuivre dans le bloc suivant
+            last_hour = raw.index[-1].floor('h')
+            complete = raw[raw.index < last_hour]
+            if anchor is not None:
+                complete = pd.concat([anchor, complete])
+            hourly = complete.resample('h').mean()
+
+            # Les heures suivant la dernière ligne complète ne peuvent être
+            # interpolées qu'avec les données du bloc suivant
+            valid = hourly.notna().all(axis=1).to_numpy().copy()
+            if anchor is not None:
+                valid[0] = False
+            if not valid.any():
+                pending = raw
+                continue
+            last_valid = hourly.index[np.flatnonzero(valid)[-1]]
+
+            next_hour = last_valid + pd.Timedelta(hours=1)
+            cleaned = self._clean(raw[raw.index < next_hour], anchor)
+            anchor = cleaned.iloc[[-1]]
+            pending = raw[raw.index >= next_hour]
+            yield cleaned
+
+        if pending is not None and not pending.empty:
+            yield self._clean(pending, anchor)
+
+    def iter_daily(self):
+        """Génère les blocs de la série journalière agrégée"""
+        partial = None  # Heures de la dernière journée, éventuellement incomplète
+        for hourly in self.iter_hourly():
+            if partial is not None:
+                hourly = pd.concat([partial, hourly])
+            last_day = hourly.index[-1].floor('D')
+            partial = hourly[hourly.index >= last_day]
+            complete = hourly[hourly.index < last_day]
+            if not complete.empty:
+                yield aggregate_daily(complete)
+
+        if partial is not None and not partial.empty:
+            yield aggregate_daily(partial)
+
+    def daily(self):
+        """Retourne la série journalière complète (une ligne par jour)"""
+        return pd.concat(list(self.iter_daily()))